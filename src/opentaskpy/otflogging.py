@@ -5,6 +5,7 @@ import logging
 import os
 import re
 from datetime import datetime
+from functools import lru_cache
 
 OTF_LOG_FORMAT = (
     "%(asctime)s — %(levelname)s - %(name)s - %(filename)s:%(lineno)s [%(threadName)s]"
@@ -123,14 +124,34 @@ def _define_log_file_name(task_id: str | None, task_type: str | None) -> str:
     else:
         os.environ["OTF_LOG_RUN_PREFIX"] = prefix
 
+    return _build_log_file_name(
+        str(LOG_DIRECTORY),
+        prefix,
+        os.environ.get("OTF_RUN_ID"),
+        task_id,
+        task_type,
+    )
+
+
+@lru_cache(maxsize=512)
+def _build_log_file_name(
+    log_directory: str,
+    prefix: str,
+    run_id: str | None,
+    task_id: str | None,
+    task_type: str | None,
+) -> str:
+    # Every value read from the environment is part of the cache key, so changing
+    # (or removing) OTF_LOG_RUN_PREFIX, OTF_RUN_ID or OTF_LOG_DIRECTORY can never
+    # return a stale path
     if task_type:
         task_type = f"_{task_type}"
     else:
         task_type = ""
 
-    directory = f"{LOG_DIRECTORY}"
-    if os.environ.get("OTF_RUN_ID") is not None:
-        directory = f"{directory}/{os.environ.get('OTF_RUN_ID')}"
+    directory = f"{log_directory}"
+    if run_id is not None:
+        directory = f"{directory}/{run_id}"
         filename = f"{prefix}{task_type}_{task_id}_running.log"
     else:
         if task_id is None:
@@ -17,6 +17,7 @@ import opentaskpy.otflogging
 from opentaskpy.remotehandlers.remotehandler import (
     RemoteExecutionHandler,
     RemoteTransferHandler,
+    compile_regex,
 )
 
 REMOTE_SCRIPT_BASE_DIR: str = "/tmp"  # nosec B108
@@ -80,11 +81,10 @@ class LocalTransfer(RemoteTransferHandler):
         )
 
         files = None
+        file_regex = compile_regex(file_pattern)
         try:
             files = [
-                f"{directory}/{f}"
-                for f in os.listdir(directory)
-                if re.match(file_pattern, f)
+                f"{directory}/{f}" for f in os.listdir(directory) if file_regex.match(f)
             ]
         except FileNotFoundError:
             files = []
@@ -184,7 +184,7 @@ class LocalTransfer(RemoteTransferHandler):
                 rename_regex = self.spec["rename"]["pattern"]
                 rename_sub = self.spec["rename"]["sub"]
 
-                file_name = re.sub(rename_regex, rename_sub, file_name)
+                file_name = compile_regex(rename_regex).sub(rename_sub, file_name)
                 final_destination = f"{destination_directory}/{file_name}"
 
             mode = self.spec.get("mode", None)
@@ -283,8 +283,8 @@ class LocalTransfer(RemoteTransferHandler):
                         rename_regex = self.spec["postCopyAction"]["pattern"]
                         rename_sub = self.spec["postCopyAction"]["sub"]
 
-                        new_file_name = re.sub(
-                            rename_regex, rename_sub, current_file_name
+                        new_file_name = compile_regex(rename_regex).sub(
+                            rename_sub, current_file_name
                         )
 
                         self.logger.info(
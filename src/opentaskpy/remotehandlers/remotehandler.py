@@ -1,6 +1,24 @@
 """Abstract classes for remote handlers."""
 
+import re
 from abc import ABC, abstractmethod
+from functools import lru_cache
+
+
+@lru_cache(maxsize=256)
+def compile_regex(pattern: str) -> re.Pattern:
+    """Compile a regex from a task definition, caching the result.
+
+    File patterns and rename patterns are matched against every file in a transfer,
+    and the same definitions are often run many times in one process.
+
+    Args:
+        pattern (str): The regex to compile.
+
+    Returns:
+        re.Pattern: The compiled regex.
+    """
+    return re.compile(pattern)
 
 
 class RemoteHandler(ABC):
@@ -21,7 +21,10 @@ from tenacity import (
 )
 
 import opentaskpy.otflogging
-from opentaskpy.remotehandlers.remotehandler import RemoteTransferHandler
+from opentaskpy.remotehandlers.remotehandler import (
+    RemoteTransferHandler,
+    compile_regex,
+)
 
 from .ssh_utils import setup_host_key_validation
 
@@ -231,9 +234,10 @@ class SFTPTransfer(RemoteTransferHandler):
             )
             return remote_files
 
+        file_regex = compile_regex(file_pattern)
         remote_file_list = self.sftp_client.listdir(directory)  # type: ignore[union-attr]
         for file in list(remote_file_list):
-            if re.match(file_pattern, file):
+            if file_regex.match(file):
                 # Get the file attributes
                 file_attr = self.sftp_client.lstat(f"{directory}/{file}")  # type: ignore[union-attr]
                 self.logger.log(12, f"File attributes {file_attr}")
@@ -376,7 +380,7 @@ class SFTPTransfer(RemoteTransferHandler):
                 rename_regex = self.spec["rename"]["pattern"]
                 rename_sub = self.spec["rename"]["sub"]
 
-                file_name = re.sub(rename_regex, rename_sub, file_name)
+                file_name = compile_regex(rename_regex).sub(rename_sub, file_name)
                 self.logger.info(
                     f"[{self.spec['hostname']}] Renaming file to {file_name}"
                 )
@@ -542,8 +546,8 @@ class SFTPTransfer(RemoteTransferHandler):
                         rename_regex = self.spec["postCopyAction"]["pattern"]
                         rename_sub = self.spec["postCopyAction"]["sub"]
 
-                        new_file_name = re.sub(
-                            rename_regex, rename_sub, current_file_name
+                        new_file_name = compile_regex(rename_regex).sub(
+                            rename_sub, current_file_name
                         )
 
                         self.logger.info(
@@ -28,8 +28,10 @@ from opentaskpy.exceptions import SSHClientError
 from opentaskpy.remotehandlers.remotehandler import (
     RemoteExecutionHandler,
     RemoteTransferHandler,
+    compile_regex,
 )
 
+from . import ssh_pool
 from .ssh_utils import setup_host_key_validation
 
 SSH_OPTIONS: str = "-o StrictHostKeyChecking=no -o BatchMode=yes -o ConnectTimeout=5"
@@ -58,27 +60,34 @@ class SSHTransfer(RemoteTransferHandler):
             __name__, spec["task_id"], self.TASK_TYPE
         )
 
-        client = SSHClient()
-        client.set_log_channel(f"{__name__}.{ spec['task_id']}.paramiko.transport")
-        setup_host_key_validation(client, spec, self.logger)
-        self.ssh_client = client
-
         # Handle default values
         if "createDirectoryIfNotExists" not in spec:
             spec["createDirectoryIfNotExists"] = False
 
         super().__init__(spec)
 
+        self.ssh_client = self._new_ssh_client()
+
+    def _new_ssh_client(self) -> SSHClient:
+        client = SSHClient()
+        client.set_log_channel(f"{__name__}.{ self.spec['task_id']}.paramiko.transport")
+        setup_host_key_validation(client, self.spec, self.logger)
+        return client
+
     def supports_direct_transfer(self) -> bool:
         """Return True, as SSH allows direct transfers by using the scp command."""
         return True
 
-    def connect(self, hostname: str, ssh_client: SSHClient | None = None) -> None:
+    def connect(self, hostname: str, ssh_client: SSHClient | None = None) -> SSHClient:
         """Connect to the remote host.
 
         Args:
             hostname (str): The hostname to connect to.
             ssh_client (SSHClient, optional): An existing SSHClient to use. Defaults to None.
+
+        Returns:
+            SSHClient: The connected client. When connection pooling is enabled, this
+            may be a different object to the one passed in.
         """
         is_remote_host = False
         if ssh_client is not None:
@@ -94,7 +103,7 @@ class SSHTransfer(RemoteTransferHandler):
             self.logger.debug(
                 f"[{self.spec['hostname']}] SSH connection to {hostname} already active"
             )
-            return
+            return ssh_client
 
         kwargs = {
             "hostname": hostname,
@@ -125,6 +134,30 @@ class SSHTransfer(RemoteTransferHandler):
             )
             kwargs["pkey"] = key
 
+        if ssh_pool.pooling_enabled():
+            ssh_client = ssh_pool.get_client(
+                ssh_pool.build_pool_key(
+                    hostname, kwargs["port"], self.spec["protocol"], kwargs
+                ),
+                lambda: self._connect_new_client(kwargs),
+            )
+            self.logger.debug(
+                f"[{self.spec['hostname']}] Using pooled SSH connection to {hostname}"
+            )
+            if not is_remote_host:
+                self.ssh_client = ssh_client
+        else:
+            self._connect_client(ssh_client, kwargs)
+
+        # Each handler gets its own SFTP session, even when the transport is shared.
+        # Callers connecting on behalf of another host open their own when they need
+        # one, so that nothing is left open on a pooled connection
+        if not is_remote_host:
+            self.sftp_connection = ssh_client.open_sftp()
+
+        return ssh_client
+
+    def _connect_client(self, ssh_client: SSHClient, kwargs: dict) -> None:
         self.connect_with_retry(ssh_client, kwargs)
 
         _, stdout, _ = ssh_client.exec_command("uname -a")  # nosec B601
@@ -135,10 +168,10 @@ class SSHTransfer(RemoteTransferHandler):
                 f" {stdout_fh.read().decode('UTF-8')}",
             )
 
-        sftp = ssh_client.open_sftp()
-
-        if not is_remote_host:
-            self.sftp_connection = sftp
+    def _connect_new_client(self, kwargs: dict) -> SSHClient:
+        ssh_client = self._new_ssh_client()
+        self._connect_client(ssh_client, kwargs)
+        return ssh_client
 
     @retry(
         reraise=True,
@@ -190,7 +223,8 @@ class SSHTransfer(RemoteTransferHandler):
 
             self.sftp_connection.close()
 
-        if self.ssh_client:
+        # Pooled connections are left open for the next handler to use
+        if self.ssh_client and not ssh_pool.is_pooled(self.ssh_client):
             self.logger.info(f"[{self.spec['hostname']}] Closing SSH connection")
             self.ssh_client.close()
 
@@ -255,9 +289,10 @@ class SSHTransfer(RemoteTransferHandler):
             )
             return remote_files
 
+        file_regex = compile_regex(file_pattern)
         remote_file_list = self.sftp_connection.listdir(directory)  # type: ignore[union-attr]
         for file in list(remote_file_list):
-            if re.match(file_pattern, file):
+            if file_regex.match(file):
                 # Get the file attributes
                 file_attr = self.sftp_connection.lstat(f"{directory}/{file}")  # type: ignore[union-attr]
                 self.logger.log(12, f"File attributes {file_attr}")
@@ -357,15 +392,42 @@ class SSHTransfer(RemoteTransferHandler):
         else:
             # Get list of files in local_staging_directory
             files = glob.glob(f"{local_staging_directory}/*")
+        uploaded_sizes = {}
         for file in files:
             self.logger.info(f"[LOCALHOST] Transferring file via SFTP: {file}")
             file_name = os.path.basename(file)
             try:
-                self.sftp_connection.put(file, f"{destination_directory}{file_name}")
+                # Skip the stat after each upload, all the sizes are checked at once below
+                self.sftp_connection.put(
+                    file, f"{destination_directory}{file_name}", confirm=False
+                )
+                uploaded_sizes[file_name] = os.stat(file).st_size
             except Exception as ex:  # pylint: disable=broad-exception-caught
                 self.logger.error(f"[LOCALHOST] Unable to transfer file via SFTP: {ex}")
                 result = 1
 
+        # Confirm the uploads with a single directory listing, rather than a stat per file
+        if uploaded_sizes:
+            try:
+                remote_sizes = {
+                    attr.filename: attr.st_size
+                    for attr in self.sftp_connection.listdir_attr(destination_directory)
+                }
+            except Exception as ex:  # pylint: disable=broad-exception-caught
+                self.logger.error(
+                    f"[{self.spec['hostname']}] Unable to list uploaded files: {ex}"
+                )
+                return 1
+
+            for file_name, size in uploaded_sizes.items():
+                if remote_sizes.get(file_name) != size:
+                    self.logger.error(
+                        f"[{self.spec['hostname']}] Size mismatch after upload of"
+                        f" {file_name}: expected {size}, got"
+                        f" {remote_sizes.get(file_name)}"
+                    )
+                    result = 1
+
         return result
 
     def transfer_files(
@@ -391,7 +453,9 @@ class SSHTransfer(RemoteTransferHandler):
 
         # If we are given a destination handler, make sure we connect to the host
         if dest_remote_handler:
-            self.connect(remote_host, dest_remote_handler.ssh_client)
+            dest_remote_handler.ssh_client = self.connect(
+                remote_host, dest_remote_handler.ssh_client
+            )
 
         # Construct an SCP command to transfer the files to the destination server
         remote_user = (
@@ -409,14 +473,19 @@ class SSHTransfer(RemoteTransferHandler):
         # Create/validate staging directory exists on destination
         # Use SFTP connection to check if the directory exists
         try:
-            dest_sftp_client.stat(destination_directory)
-        except FileNotFoundError:
-            # Create the directory
-            self.logger.info(
-                f"[{dest_remote_handler.spec['hostname']}] Creating destination"
-                f" directory {destination_directory}"
-            )
-            mkdir_p(dest_sftp_client, destination_directory)
+            try:
+                dest_sftp_client.stat(destination_directory)
+            except FileNotFoundError:
+                # Create the directory
+                self.logger.info(
+                    f"[{dest_remote_handler.spec['hostname']}] Creating destination"
+                    f" directory {destination_directory}"
+                )
+                mkdir_p(dest_sftp_client, destination_directory)
+        finally:
+            # The connection may be pooled, so close the session rather than leaving
+            # the channel open
+            dest_sftp_client.close()
 
         # Sanitise arguments
         files = [quote(file) for file in files]
@@ -560,7 +629,7 @@ class SSHTransfer(RemoteTransferHandler):
                 rename_regex = self.spec["rename"]["pattern"]
                 rename_sub = self.spec["rename"]["sub"]
 
-                file_name = re.sub(rename_regex, rename_sub, file_name)
+                file_name = compile_regex(rename_regex).sub(rename_sub, file_name)
                 self.logger.info(
                     f"{self.spec['hostname']} Renaming file to {file_name}"
                 )
@@ -708,8 +777,8 @@ class SSHTransfer(RemoteTransferHandler):
                         rename_regex = self.spec["postCopyAction"]["pattern"]
                         rename_sub = self.spec["postCopyAction"]["sub"]
 
-                        new_file_name = re.sub(
-                            rename_regex, rename_sub, current_file_name
+                        new_file_name = compile_regex(rename_regex).sub(
+                            rename_sub, current_file_name
                         )
 
                         self.logger.info(
@@ -800,6 +869,7 @@ class SSHTransfer(RemoteTransferHandler):
             f"{self.spec['logWatch']['directory']}/{self.spec['logWatch']['log']}"
         )
 
+        content_regex = compile_regex(self.spec["logWatch"]["contentRegex"])
         with self.sftp_connection.open(log_file) as log_fh:
             for i, line in enumerate(log_fh):
                 # We need to start after the previous line in the log
@@ -807,7 +877,7 @@ class SSHTransfer(RemoteTransferHandler):
                     self.logger.log(
                         11, f"[{self.spec['hostname']}] Log line: {line.strip()}"
                     )
-                    if re.search(self.spec["logWatch"]["contentRegex"], line.strip()):
+                    if content_regex.search(line.strip()):
                         self.logger.log(
                             12,
                             f"[{self.spec['hostname']}] Found matching line in log:"
@@ -906,7 +976,8 @@ class SSHExecution(RemoteExecutionHandler):
 
     def tidy(self) -> None:
         """Tidy up the SSH connection."""
-        if self.ssh_client:
+        # Pooled connections are left open for the next handler to use
+        if self.ssh_client and not ssh_pool.is_pooled(self.ssh_client):
             self.logger.info(f"[{self.remote_host}] Closing SFTP connection")
             self.ssh_client.close()
 
@@ -928,12 +999,15 @@ class SSHExecution(RemoteExecutionHandler):
 
         super().__init__(spec)
 
+        self.ssh_client = self._new_ssh_client()
+
+    def _new_ssh_client(self) -> SSHClient:
         client = SSHClient()
-        client.set_log_channel(f"{__name__}.{ spec['task_id']}.paramiko.transport")
+        client.set_log_channel(f"{__name__}.{ self.spec['task_id']}.paramiko.transport")
 
-        setup_host_key_validation(client, spec, self.logger)
+        setup_host_key_validation(client, self.spec, self.logger)
 
-        self.ssh_client = client
+        return client
 
     def connect(self) -> None:
         """Connect to the remote host."""
@@ -968,15 +1042,31 @@ class SSHExecution(RemoteExecutionHandler):
             kwargs["key_filename"] = self.spec["protocol"]["credentials"]["keyFile"]
 
         try:
-            self.ssh_client.connect(**kwargs)
-            _, stdout, _ = self.ssh_client.exec_command("uname -a")  # nosec B601
-            with stdout as stdout_fh:
-                output = stdout_fh.read().decode("UTF-8")
-                self.logger.log(11, f"[{self.remote_host}] Remote uname: {output}")
+            if ssh_pool.pooling_enabled():
+                self.ssh_client = ssh_pool.get_client(
+                    ssh_pool.build_pool_key(
+                        self.remote_host, kwargs["port"], self.spec["protocol"], kwargs
+                    ),
+                    lambda: self._connect_client(self._new_ssh_client(), kwargs),
+                )
+                self.logger.debug(f"[{self.remote_host}] Using pooled SSH connection")
+            else:
+                self._connect_client(self.ssh_client, kwargs)
         except Exception as ex:
             self.logger.error(f"Unable to connect to {self.remote_host}: {ex}")
             raise ex
 
+    def _connect_client(self, ssh_client: SSHClient, kwargs: dict) -> SSHClient:
+        ssh_client.connect(**kwargs)
+        # Only pay for the extra channel round trip if the output would be logged
+        if self.logger.isEnabledFor(11):
+            _, stdout, _ = ssh_client.exec_command("uname -a")  # nosec B601
+            with stdout as stdout_fh:
+                output = stdout_fh.read().decode("UTF-8")
+                self.logger.log(11, f"[{self.remote_host}] Remote uname: {output}")
+
+        return ssh_client
+
     def _get_child_processes(self, parent_pid: int, process_listing: list) -> list:
         """Get the child processes of a given PID.
 
@@ -0,0 +1,134 @@
+"""Shared SSH connection pool.
+
+When the ``OTF_SSH_CONNECTION_POOL`` environment variable is set to ``1``, SSH clients
+are shared between every SSH remote handler in the process that connects to the same
+host, with the same user and credentials. This avoids repeating the SSH handshake for
+each task in a batch. Each handler still opens its own channels (and SFTP sessions) on
+top of the shared transport.
+"""
+
+import atexit
+import hashlib
+import os
+import threading
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+# Only needed for type hints. Importing paramiko here would load it for every task,
+# including ones that never use SSH
+if TYPE_CHECKING:
+    from paramiko import SSHClient
+
+_pool_lock = threading.RLock()
+_clients: dict[tuple, "SSHClient"] = {}
+_key_locks: dict[tuple, threading.RLock] = {}
+
+
+def pooling_enabled() -> bool:
+    """Return whether SSH connection pooling has been enabled.
+
+    Returns:
+        bool: True if OTF_SSH_CONNECTION_POOL is set to 1
+    """
+    return os.environ.get("OTF_SSH_CONNECTION_POOL") == "1"
+
+
+def build_pool_key(
+    hostname: str, port: int, protocol_spec: dict, connect_kwargs: dict
+) -> tuple:
+    """Build the key used to identify a pooled connection.
+
+    Everything that can change how the connection is authenticated or validated is
+    part of the key, so that a client is never shared between differing definitions.
+    That includes the connect options, which differ between handler types (e.g.
+    transfers never authenticate with the SSH agent).
+
+    Args:
+        hostname (str): The host being connected to
+        port (int): The port being connected to
+        protocol_spec (dict): The protocol section of the task definition
+        connect_kwargs (dict): The arguments passed to SSHClient.connect
+
+    Returns:
+        tuple: The pool key
+    """
+    credentials = protocol_spec["credentials"]
+    # Don't hold on to the raw private key, a digest is enough to tell them apart
+    key_digest = (
+        hashlib.sha256(credentials["key"].encode("utf-8")).hexdigest()
+        if "key" in credentials
+        else None
+    )
+    return (
+        hostname,
+        port,
+        credentials["username"],
+        os.environ.get("OTF_SSH_KEY"),
+        credentials.get("keyFile"),
+        key_digest,
+        bool(protocol_spec.get("hostKeyValidation", False)),
+        protocol_spec.get("knownHostsFile"),
+        # paramiko allows the agent unless told otherwise
+        connect_kwargs.get("allow_agent", True),
+        connect_kwargs.get("timeout"),
+    )
+
+
+def get_client(key: tuple, factory: Callable[[], "SSHClient"]) -> "SSHClient":
+    """Return a connected client from the pool, creating it if needed.
+
+    Args:
+        key (tuple): The pool key, from build_pool_key
+        factory (Callable[[], SSHClient]): Function returning a new, connected client
+
+    Returns:
+        SSHClient: The connected client
+    """
+    with _pool_lock:
+        key_lock = _key_locks.setdefault(key, threading.RLock())
+
+    # Only lock the individual key while connecting, so that connections to other
+    # hosts are not held up
+    with key_lock:
+        client = _clients.get(key)
+        if client is not None:
+            transport = client.get_transport()
+            if transport is not None and transport.is_active():
+                return client
+            # The connection has dropped, so replace it
+            client.close()
+
+        client = factory()
+        with _pool_lock:
+            _clients[key] = client
+
+        return client
+
+
+def is_pooled(client: "SSHClient | None") -> bool:
+    """Check whether a client is owned by the pool.
+
+    Pooled clients must not be closed by the remote handlers that borrow them.
+
+    Args:
+        client (SSHClient | None): The client to check
+
+    Returns:
+        bool: True if the client is in the pool
+    """
+    with _pool_lock:
+        return any(pooled is client for pooled in _clients.values())
+
+
+def close_all() -> None:
+    """Close every pooled connection and empty the pool."""
+    with _pool_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _key_locks.clear()
+
+
+# Pooled clients outlive the handlers that use them, so close them when the process
+# exits
+atexit.register(close_all)
@@ -2,13 +2,12 @@
 
 import threading
 from concurrent.futures import ThreadPoolExecutor, wait
-from importlib import import_module
-from sys import modules
 from typing import NamedTuple
 
 import opentaskpy.otflogging
+from opentaskpy.exceptions import UnknownProtocolError
 from opentaskpy.remotehandlers.remotehandler import RemoteHandler
-from opentaskpy.taskhandlers.taskhandler import TaskHandler
+from opentaskpy.taskhandlers.taskhandler import TaskHandler, resolve_protocol_class
 
 
 class DefaultProtocolCharacteristics(NamedTuple):
@@ -45,7 +44,8 @@ class Execution(TaskHandler):
             execution_definition (dict): The execution definition.
         """
         self.task_id = task_id
-        self.execution_definition = execution_definition
+        # Shallow copy, so adding the task_id doesn't modify the caller's definition
+        self.execution_definition = {**execution_definition}
 
         self.logger = opentaskpy.otflogging.init_logging(
             "opentaskpy.taskhandlers.execution", self.task_id, TASK_TYPE
@@ -91,14 +91,14 @@ class Execution(TaskHandler):
         )
 
     def _get_default_class(self, protocol_name: str) -> type:
-        class_name = DEFAULT_PROTOCOL_MAP[protocol_name].class_
-        module_name = DEFAULT_PROTOCOL_MAP[protocol_name].module
-
-        # Load module
-        if module_name not in modules:
-            import_module(module_name)
+        handler_class = resolve_protocol_class(
+            DEFAULT_PROTOCOL_MAP[protocol_name].module,
+            DEFAULT_PROTOCOL_MAP[protocol_name].class_,
+        )
+        if handler_class is None:
+            raise UnknownProtocolError(f"Unknown protocol {protocol_name}")
 
-        return getattr(modules[module_name], class_name)  # type: ignore[no-any-return]
+        return handler_class  # type: ignore[no-any-return]
 
     def _set_remote_handlers(self) -> None:
         """Set the remote handlers.
@@ -1,6 +1,7 @@
 """Abstract task handler class."""
 
 from abc import ABC, abstractmethod
+from functools import cache
 from importlib import import_module
 from logging import Logger
 from sys import modules
@@ -10,6 +11,33 @@ from opentaskpy.exceptions import UnknownProtocolError
 from opentaskpy.remotehandlers.remotehandler import RemoteHandler
 
 
+@cache
+def resolve_protocol_class(module_name: str, class_name: str) -> type | None:
+    """Import a module and return a protocol class from it.
+
+    Results are cached, so each protocol is only resolved once per process. Modules
+    that cannot be found are cached as None, so that repeated lookups of an unknown
+    protocol don't search the import path again. This means a protocol plugin
+    installed after the first lookup for it won't be found until the process is
+    restarted.
+
+    Args:
+        module_name (str): The module containing the protocol class.
+        class_name (str): The name of the protocol class.
+
+    Returns:
+        type | None: The protocol class, or None if the module could not be found.
+    """
+    # Import the module if its not already loaded
+    if module_name not in modules:
+        try:
+            import_module(module_name)
+        except ModuleNotFoundError:
+            return None
+
+    return getattr(modules[module_name], class_name)  # type: ignore[no-any-return]
+
+
 class TaskHandler(ABC):
     """Abstract task handler class."""
 
@@ -121,17 +149,15 @@ class TaskHandler(ABC):
         if addon_package == "":
             raise UnknownProtocolError(f"Unknown protocol {protocol_name}")
 
-        # Import the plugin if its not already loaded
         if addon_package not in modules:
-            # Check the module is loadable
-            try:
-                self.logger.log(12, f"Loading addon protocol: {addon_package}")
-                import_module(addon_package)
-            except ModuleNotFoundError as exc:
-                raise UnknownProtocolError(f"Unknown protocol {protocol_name}") from exc
+            self.logger.log(12, f"Loading addon protocol: {addon_package}")
 
         # Get the imported class relating to addon_protocol
-        addon_class = getattr(modules[addon_package], protocol_name.split(".")[-1])
+        addon_class = resolve_protocol_class(
+            addon_package, protocol_name.split(".")[-1]
+        )
+        if addon_class is None:
+            raise UnknownProtocolError(f"Unknown protocol {protocol_name}")
 
         # Create the remote handler from this class
         return addon_class(spec)
@@ -4,10 +4,9 @@ import random
 import shutil
 import threading
 import time
-from importlib import import_module
+from concurrent.futures import ThreadPoolExecutor
 from math import ceil, floor
 from os import environ, getpid, makedirs, path, remove
-from sys import modules
 from typing import NamedTuple
 
 import gnupg
@@ -15,7 +14,7 @@ import gnupg
 import opentaskpy.otflogging
 from opentaskpy import exceptions
 from opentaskpy.remotehandlers.remotehandler import RemoteTransferHandler
-from opentaskpy.taskhandlers.taskhandler import TaskHandler
+from opentaskpy.taskhandlers.taskhandler import TaskHandler, resolve_protocol_class
 
 # Full transfers expect that the remote host has a base install of python3
 # We transfer over the wrapper script to the remote host and trigger it, which is responsible
@@ -29,6 +28,15 @@ class DefaultProtocolCharacteristics(NamedTuple):
     class_: str
 
 
+class DestinationTransfer(NamedTuple):
+    """Class defining the files to send to a single destination."""
+
+    dest_file_spec: dict
+    dest_remote_handler: RemoteTransferHandler
+    remote_files: dict
+    encryption_requested: bool
+
+
 TASK_TYPE = "T"
 DEFAULT_PROTOCOL_MAP = {
     "ssh": DefaultProtocolCharacteristics(
@@ -48,6 +56,8 @@ DEFAULT_PROTOCOL_MAP = {
     ),
 }
 DEFAULT_STAGING_DIR_BASE = "/tmp"  # nosec B108
+# Upper limit on the number of destinations transferred to concurrently
+MAX_DEST_WORKERS = 8
 
 
 class Transfer(TaskHandler):  # pylint: disable=too-many-instance-attributes
@@ -78,6 +88,10 @@ class Transfer(TaskHandler):  # pylint: disable=too-many-instance-attributes
         else:
             self.local_staging_dir = f"{DEFAULT_STAGING_DIR_BASE}/{staging_dir_name}"
 
+        # The source remote handler is shared by every destination, so direct
+        # transfers through it must not overlap
+        self.source_handler_lock = threading.Lock()
+
         self.logger = opentaskpy.otflogging.init_logging(
             "opentaskpy.taskhandlers.transfer", self.task_id, TASK_TYPE
         )
@@ -132,14 +146,14 @@ class Transfer(TaskHandler):  # pylint: disable=too-many-instance-attributes
         return super().return_result(status, message, exception)  # type: ignore[no-any-return]
 
     def _get_default_class(self, protocol_name: str) -> type:
-        class_name = DEFAULT_PROTOCOL_MAP[protocol_name].class_
-        module_name = DEFAULT_PROTOCOL_MAP[protocol_name].module
-
-        # Load module
-        if module_name not in modules:
-            import_module(module_name)
+        handler_class = resolve_protocol_class(
+            DEFAULT_PROTOCOL_MAP[protocol_name].module,
+            DEFAULT_PROTOCOL_MAP[protocol_name].class_,
+        )
+        if handler_class is None:
+            raise exceptions.UnknownProtocolError(f"Unknown protocol {protocol_name}")
 
-        return getattr(modules[module_name], class_name)  # type: ignore[no-any-return]
+        return handler_class  # type: ignore[no-any-return]
 
     def _set_remote_handlers(self) -> None:
         # Based on the transfer definition, determine what to do first
@@ -477,7 +491,7 @@ class Transfer(TaskHandler):  # pylint: disable=too-many-instance-attributes
 
                 decrypted_files = remote_files.copy()
 
-            i = 0
+            encryption_requests = []
             for dest_file_spec in self.dest_file_specs:
                 encryption_requested = (
                     "encryption" in dest_file_spec
@@ -491,9 +505,22 @@ class Transfer(TaskHandler):  # pylint: disable=too-many-instance-attributes
                         "Encryption requested but not supported for this transfer",
                         exception=exceptions.EncryptionNotSupportedError,
                     )
+                encryption_requests.append(encryption_requested)
+
+            # Files encrypted for different destinations share the same names in the
+            # staging directory, so if any destination needs encrypting, each one is
+            # encrypted and sent before moving onto the next
+            send_concurrently = len(self.dest_file_specs) > 1 and not any(
+                encryption_requests
+            )
+
+            dest_transfers = []
+            for i, dest_file_spec in enumerate(self.dest_file_specs):
+                encryption_requested = encryption_requests[i]
+                dest_files = remote_files
 
                 # If encryption is requested and its possible, then encrypt the file(s)
-                if encryption_requested and can_do_encryption:
+                if encryption_requested:
 
                     self.logger.info("Encrypting files")
 
@@ -520,121 +547,59 @@ class Transfer(TaskHandler):  # pylint: disable=too-many-instance-attributes
                         "output_extension", "gpg"
                     )
                     # Loop through each file and encrypt it using gnupg
-                    remote_files = self.encrypt_files(
+                    dest_files = self.encrypt_files(
                         local_files, public_key, private_key, extension
                     )
 
-                    encrypted_files = remote_files.copy()
-
-                # Handle the push transfers first
-                associated_dest_remote_handler = self.dest_remote_handlers[i]
-                # If this is a default push transfer, and both source and dest protocols are the same
-                if (
-                    (
-                        "transferType" not in dest_file_spec
-                        or dest_file_spec["transferType"] == "push"
-                        # And the destination and source remote handler classes are the same
-                    )
-                    and not any_different_protocols
-                    and self.source_remote_handler.supports_direct_transfer()
-                ):
-                    transfer_result = self.source_remote_handler.transfer_files(
-                        remote_files,
-                        dest_file_spec,
-                        dest_remote_handler=associated_dest_remote_handler,
-                    )
-                    if transfer_result != 0:
-                        return self.return_result(
-                            1,
-                            "Remote transfer errored",
-                            exception=exceptions.RemoteTransferError,
-                        )
-
-                    self.logger.info("Transfer completed successfully")
-                # If this is a default push transfer, and source and dest protocols are different
-                elif (
-                    (
-                        "transferType" in dest_file_spec
-                        and (
-                            dest_file_spec["transferType"] == "push"
-                            or dest_file_spec["transferType"] == "proxy"
-                        )
-                    )
-                    or different_protocols
-                    or not self.source_remote_handler.supports_direct_transfer()
-                ):
-                    self.logger.debug(
-                        "Transfer protocols are different, or proxy transfer is"
-                        " requested"
-                    )
-
-                    # For local transfers, the handler needs the list of local files to push
-                    # If there was decryption, then the files will be local regardless, so
-                    # needs the list of files then too, so it doesn't upload the encrypted files
-                    if (
-                        self.source_file_spec["protocol"]["name"] != "local"
-                        and not decryption_requested
-                        and not encryption_requested
-                    ):
-                        transfer_result = (
-                            associated_dest_remote_handler.push_files_from_worker(
-                                self.local_staging_dir
-                            )
-                        )
-                    else:
-                        transfer_result = (
-                            associated_dest_remote_handler.push_files_from_worker(
-                                self.local_staging_dir, file_list=remote_files
-                            )
-                        )
+                    encrypted_files.update(dest_files)
 
-                    if transfer_result != 0:
-                        return self.return_result(
-                            1,
-                            "Push of files to destination errored",
-                            exception=exceptions.RemoteTransferError,
-                        )
-
-                elif (
-                    "transferType" in dest_file_spec
-                    and dest_file_spec["transferType"] == "pull"
-                ):
-                    transfer_result = associated_dest_remote_handler.pull_files(
-                        remote_files, self.source_file_spec
+                dest_transfer = DestinationTransfer(
+                    dest_file_spec,
+                    self.dest_remote_handlers[i],
+                    dest_files,
+                    encryption_requested,
+                )
+                if send_concurrently:
+                    dest_transfers.append(dest_transfer)
+                    continue
+
+                # When sending one at a time, stop at the first failure
+                dest_error = self._transfer_to_destination(
+                    dest_transfer,
+                    any_different_protocols=any_different_protocols,
+                    different_protocols=different_protocols,
+                    decryption_requested=decryption_requested,
+                )
+                if dest_error:
+                    return self.return_result(
+                        1, dest_error, exception=exceptions.RemoteTransferError
                     )
-                    if transfer_result != 0:
-                        return self.return_result(
-                            1,
-                            "Remote PULL transfer errored",
-                            exception=exceptions.RemoteTransferError,
-                        )
-
-                    self.logger.info("Transfer completed successfully")
 
-                # Handle any ownership and permissions changes
-                if dest_file_spec["protocol"]["name"] == "ssh":
-                    move_result = self.dest_remote_handlers[
-                        i
-                    ].move_files_to_final_location(remote_files)
-                    if move_result != 0:
-                        return self.return_result(
-                            1,
-                            "Error moving file into final location",
-                            exception=exceptions.RemoteTransferError,
+            # Each destination has its own remote handler, so they can be sent to
+            # concurrently
+            if dest_transfers:
+                with ThreadPoolExecutor(
+                    max_workers=min(MAX_DEST_WORKERS, len(dest_transfers))
+                ) as executor:
+                    futures = [
+                        executor.submit(
+                            self._transfer_to_destination,
+                            dest_transfer,
+                            any_different_protocols=any_different_protocols,
+                            different_protocols=different_protocols,
+                            decryption_requested=decryption_requested,
                         )
+                        for dest_transfer in dest_transfers
+                    ]
+                    dest_errors = [future.result() for future in futures]
 
-                # Create any flag files that might need creating
-                if "flags" in dest_file_spec:
-                    flag_result = self.dest_remote_handlers[i].create_flag_files()
-                    if flag_result != 0:
+                # Report the first failure, in the order the destinations were defined
+                for dest_error in dest_errors:
+                    if dest_error:
                         return self.return_result(
-                            1,
-                            "Error creating flag files",
-                            exception=exceptions.RemoteTransferError,
+                            1, dest_error, exception=exceptions.RemoteTransferError
                         )
 
-                i += 1
-
             if (
                 different_protocols
                 and self.local_staging_dir != self.source_file_spec["directory"]
@@ -687,6 +652,123 @@ class Transfer(TaskHandler):  # pylint: disable=too-many-instance-attributes
 
         return self.return_result(0)
 
+    def _transfer_to_destination(  # noqa: C901
+        self,
+        dest_transfer: DestinationTransfer,
+        *,
+        any_different_protocols: bool,
+        different_protocols: bool,
+        decryption_requested: bool,
+    ) -> str | None:
+        """Transfer the files to a single destination.
+
+        Args:
+            dest_transfer (DestinationTransfer): The destination and the files to send to it.
+            any_different_protocols (bool): Whether any destination uses a different protocol to the source.
+            different_protocols (bool): Whether the files had to be pulled to the worker first.
+            decryption_requested (bool): Whether the source files were decrypted.
+
+        Returns:
+            str | None: The error message if the transfer failed, otherwise None.
+        """
+        (
+            dest_file_spec,
+            associated_dest_remote_handler,
+            remote_files,
+            encryption_requested,
+        ) = dest_transfer
+
+        # Handle the push transfers first
+        # If this is a default push transfer, and both source and dest protocols are the same
+        if (
+            (
+                "transferType" not in dest_file_spec
+                or dest_file_spec["transferType"] == "push"
+                # And the destination and source remote handler classes are the same
+            )
+            and not any_different_protocols
+            and self.source_remote_handler.supports_direct_transfer()
+        ):
+            with self.source_handler_lock:
+                transfer_result = self.source_remote_handler.transfer_files(
+                    remote_files,
+                    dest_file_spec,
+                    dest_remote_handler=associated_dest_remote_handler,
+                )
+            if transfer_result != 0:
+                return "Remote transfer errored"
+
+            self.logger.info("Transfer completed successfully")
+        # If this is a default push transfer, and source and dest protocols are different
+        elif (
+            (
+                "transferType" in dest_file_spec
+                and (
+                    dest_file_spec["transferType"] == "push"
+                    or dest_file_spec["transferType"] == "proxy"
+                )
+            )
+            or different_protocols
+            or not self.source_remote_handler.supports_direct_transfer()
+        ):
+            self.logger.debug(
+                "Transfer protocols are different, or proxy transfer is requested"
+            )
+
+            # For local transfers, the handler needs the list of local files to push
+            # If there was decryption, then the files will be local regardless, so
+            # needs the list of files then too, so it doesn't upload the encrypted files
+            file_list = remote_files
+            if (
+                self.source_file_spec["protocol"]["name"] != "local"
+                and not decryption_requested
+                and not encryption_requested
+            ):
+                # Otherwise push the copies that were pulled into the staging
+                # directory, rather than everything in it, which can include files
+                # encrypted for other destinations
+                file_list = {
+                    f"{self.local_staging_dir}/{path.basename(file)}": remote_files[
+                        file
+                    ]
+                    for file in remote_files
+                }
+
+            transfer_result = associated_dest_remote_handler.push_files_from_worker(
+                self.local_staging_dir, file_list=file_list
+            )
+
+            if transfer_result != 0:
+                return "Push of files to destination errored"
+
+        elif (
+            "transferType" in dest_file_spec
+            and dest_file_spec["transferType"] == "pull"
+        ):
+            transfer_result = associated_dest_remote_handler.pull_files(
+                remote_files, self.source_file_spec
+            )
+            if transfer_result != 0:
+                return "Remote PULL transfer errored"
+
+            self.logger.info("Transfer completed successfully")
+
+        # Handle any ownership and permissions changes
+        if dest_file_spec["protocol"]["name"] == "ssh":
+            move_result = associated_dest_remote_handler.move_files_to_final_location(
+                remote_files
+            )
+            if move_result != 0:
+                return "Error moving file into final location"
+
+        # Create any flag files that might need creating
+        if "flags" in dest_file_spec:
+            flag_result = associated_dest_remote_handler.create_flag_files()
+            if flag_result != 0:
+                return "Error creating flag files"
+
+        return None
+
     def encrypt_files(
         self,
         files: dict,
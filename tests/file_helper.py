@@ -2,6 +2,7 @@
 import logging
 import os
 import shutil
+from pathlib import Path
 from re import match
 
 import pytest
@@ -10,14 +11,50 @@ BASE_DIRECTORY = "test/testFiles"
 
 
 def write_test_file(file_name, content=None, length=0, mode="w"):
-    with open(file_name, mode) as f:
-        if content is not None:
-            f.write(content)
-        else:
-            f.write("a" * length)
+    if content is None:
+        content = "a" * length
+    data = content.encode("utf-8") if isinstance(content, str) else content
+
+    # Test files are tiny, so write them with a single syscall rather than going
+    # through Python's buffered file objects
+    flags = os.O_WRONLY | os.O_CREAT
+    flags |= os.O_APPEND if "a" in mode else os.O_TRUNC
+    fd = os.open(file_name, flags, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
     logging.info(f"Wrote file: {file_name}")
 
 
+def write_test_files(files, mode="w"):
+    # Write a batch of files in one go, creating each parent directory only once
+    for directory in {os.path.dirname(file_name) for file_name in files}:
+        os.makedirs(directory, exist_ok=True)
+    for file_name, content in files.items():
+        write_test_file(file_name, content=content, mode=mode)
+
+
+def list_directory(directory: str | Path) -> set[str]:
+    return {entry.name for entry in os.scandir(directory)}
+
+
+def empty_directory(directory: str | Path) -> None:
+    # Unlink each entry straight from the scandir results, without building paths
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            os.unlink(entry.path)
+
+
+def clone_task_definition(task_definition: dict, **source_overrides) -> dict:
+    # Only copy the levels that tests change, deepcopy walks the whole definition
+    return {
+        **task_definition,
+        "source": {**task_definition["source"], **source_overrides},
+        "destination": [dict(dest) for dest in task_definition["destination"]],
+    }
+
+
 def list_test_files(directory, file_pattern, delimiter):
     files = [
         f"{directory}/{f}"
@@ -1,6 +1,7 @@
 # pylint: skip-file
-import os
+from pathlib import Path
 
+import gnupg
 import pytest
 from pytest_shell import fs
 
@@ -267,6 +268,40 @@ ZyUe4wdfrT2aOrSwrKL8mjEVM2MGkvkCYWo0C67FRzBEyo07OJyFbduc4s1c0wZG
 -----END PGP PRIVATE KEY BLOCK-----"""
 
 
+@pytest.fixture(scope="session")
+def gpg_env(tmp_path_factory, public_key, private_key, private_key_2):
+    # Build one keyring for the whole session, rather than starting gpg and importing
+    # the keys again in every test
+    gnupghome = tmp_path_factory.mktemp("gpg")
+    gpg = gnupg.GPG(gnupghome=str(gnupghome))
+    gpg.import_keys(public_key)
+    gpg.import_keys(private_key)
+    gpg.import_keys(private_key_2)
+    return gpg, gnupghome
+
+
+@pytest.fixture(scope="session")
+def encrypted_test_file(tmp_path_factory, gpg_env):
+    # Encrypt the file once, tests copy the encrypted file to wherever they need it.
+    # Returns the paths of the original and the encrypted file
+    directory = tmp_path_factory.mktemp("encrypted")
+    content = b"test12345678"
+    plaintext = directory / "test.decryption.txt"
+    plaintext.write_bytes(content)
+
+    # Encrypt the content already in memory, rather than reading the file back
+    gpg, _ = gpg_env
+    status = gpg.encrypt(
+        content,
+        "test@example.com",
+        always_trust=True,
+        output=str(directory / "test.decryption.txt.gpg"),
+    )
+    assert status.ok
+
+    return plaintext, directory / "test.decryption.txt.gpg"
+
+
 @pytest.fixture(scope="function")
 def store_pgp_keys(public_key, public_key_2, private_key, private_key_2) -> bool:
     pub1 = "\\\\n".join(public_key.splitlines())
@@ -275,14 +310,10 @@ def store_pgp_keys(public_key, public_key_2, private_key, private_key_2) -> bool
     prv2 = "\\\\n".join(private_key_2.splitlines())
 
     # Remove all the files and the recreate them
-    if os.path.exists("/tmp/public_key_1.txt"):
-        os.remove("/tmp/public_key_1.txt")
-    if os.path.exists("/tmp/public_key_2.txt"):
-        os.remove("/tmp/public_key_2.txt")
-    if os.path.exists("/tmp/private_key_1.txt"):
-        os.remove("/tmp/private_key_1.txt")
-    if os.path.exists("/tmp/private_key_2.txt"):
-        os.remove("/tmp/private_key_2.txt")
+    Path("/tmp/public_key_1.txt").unlink(missing_ok=True)
+    Path("/tmp/public_key_2.txt").unlink(missing_ok=True)
+    Path("/tmp/private_key_1.txt").unlink(missing_ok=True)
+    Path("/tmp/private_key_2.txt").unlink(missing_ok=True)
 
     fs.create_files(
         [
@@ -4,10 +4,13 @@ import contextlib
 import os
 import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
 from pytest_shell import fs
 
+from opentaskpy.remotehandlers import ssh_pool
+
 
 @pytest.fixture(scope="function")
 def env_vars() -> None:
@@ -21,6 +24,10 @@ def env_vars() -> None:
     if "OTF_NO_LOG" in os.environ:
         del os.environ["OTF_NO_LOG"]
 
+    create_variable_lookup_files()
+
+
+def create_variable_lookup_files() -> None:
     # We're using the proper config file for this, so we need to make sure something exist in /tmp/variable_lookup.txt
     fs.create_files(
         [
@@ -100,13 +107,15 @@ def test_directories(root_dir) -> None:
             structure.append(f"{root_dir}/testFiles/{protocol}_{host}/dest")
             structure.append(f"{root_dir}/testFiles/{protocol}_{host}/archive")
 
-    fs.create_files(structure)
+    # These are all directories, so there's no need to go through fs.create_files
+    for directory in structure:
+        os.makedirs(directory, exist_ok=True)
 
 
 @pytest.fixture(scope="session")
-def setup_ssh_keys(docker_services, root_dir, test_directories, ssh_1, ssh_2) -> None:
-    # Run command locally
-    # if ssh key doesn't exist yet
+def ssh_private_key_file(root_dir, test_directories) -> str:
+    # Generate (or validate) the SSH key once per session, so that the SSH and SFTP
+    # setup fixtures can both reuse it
     ssh_private_key_file = f"{root_dir}/testFiles/id_rsa"
     # Load the ssh key and validate it
     from paramiko import RSAKey
@@ -121,15 +130,10 @@ def setup_ssh_keys(docker_services, root_dir, test_directories, ssh_1, ssh_2) ->
             os.remove(ssh_private_key_file)
         # Generate the key
         subprocess.run(
-            ["ssh-keygen", "-t", "rsa", "-N", "", "-f", ssh_private_key_file]
-        ).returncode
-
-    # Copy the file into the ssh directory for each host
-    for i in ["1", "2"]:
-        shutil.copy(ssh_private_key_file, f"{root_dir}/testFiles/ssh_{i}/ssh/id_rsa")
-        shutil.copy(
-            f"{root_dir}/testFiles/id_rsa.pub",
-            f"{root_dir}/testFiles/ssh_{i}/ssh/authorized_keys",
+            ["ssh-keygen", "-t", "rsa", "-N", "", "-f", ssh_private_key_file],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
         )
 
     # Copy the file into the ssh directory on this host
@@ -141,6 +145,53 @@ def setup_ssh_keys(docker_services, root_dir, test_directories, ssh_1, ssh_2) ->
 
     shutil.copy(ssh_private_key_file, f"{home_dir}/.ssh/id_rsa")
 
+    return ssh_private_key_file
+
+
+def _run_on_hosts(docker_services, hosts, commands, skip_if=None) -> None:
+    # The commands for a host depend on each other, so they run in order, but each
+    # host is independent so they can be set up at the same time
+    def run_commands(host):
+        # If the host was already set up by an earlier session against the same
+        # containers, there's nothing to do
+        if skip_if:
+            try:
+                docker_services.execute(host, "sh", "-c", skip_if)
+                return
+            except subprocess.CalledProcessError:
+                # The check failed, so the host still needs setting up
+                pass
+
+        for command in commands:
+            docker_services.execute(host, *command)
+
+    with ThreadPoolExecutor(max_workers=len(hosts)) as executor:
+        # Consume the results so that any failure is raised here
+        list(executor.map(run_commands, hosts))
+
+
+def _already_set_up(uid, key_dir) -> str:
+    # The user must have the right uid, and the keys must match the ones from this
+    # session, otherwise the setup needs running again
+    return (
+        f'[ "$(id -u application)" = "{uid}" ]'
+        f" && cmp -s {key_dir}/id_rsa /home/application/.ssh/id_rsa"
+        f" && cmp -s {key_dir}/authorized_keys /home/application/.ssh/authorized_keys"
+    )
+
+
+@pytest.fixture(scope="session")
+def setup_ssh_keys(
+    docker_services, root_dir, ssh_private_key_file, ssh_1, ssh_2
+) -> None:
+    # Copy the file into the ssh directory for each host
+    for i in ["1", "2"]:
+        shutil.copy(ssh_private_key_file, f"{root_dir}/testFiles/ssh_{i}/ssh/id_rsa")
+        shutil.copy(
+            f"{root_dir}/testFiles/id_rsa.pub",
+            f"{root_dir}/testFiles/ssh_{i}/ssh/authorized_keys",
+        )
+
     # Run the docker exec command to create the user
     # Get the current uid for the running process
     uid = str(os.getuid())
@@ -158,9 +209,47 @@ def setup_ssh_keys(docker_services, root_dir, test_directories, ssh_1, ssh_2) ->
         ("chmod", "-R", "700", "/home/application/.ssh"),
         ("chown", "-R", "application", "/tmp/testFiles"),
     ]
-    for host in ["ssh_1", "ssh_2"]:
-        for command in commands:
-            docker_services.execute(host, *command)
+    _run_on_hosts(
+        docker_services,
+        ["ssh_1", "ssh_2"],
+        commands,
+        skip_if=_already_set_up(uid, "/tmp/testFiles/ssh"),
+    )
+
+
+@pytest.fixture(scope="session")
+def known_hosts_cache(tmp_path_factory):
+    # Fetch each host's key once per session, so host key validation tests can restore
+    # known_hosts without accepting the keys over a new SSH connection every time
+    from paramiko import HostKeys, Transport
+
+    cache_dir = tmp_path_factory.mktemp("known_hosts")
+    host_keys = {}
+
+    def known_hosts(*hosts: str) -> str:
+        for host in hosts:
+            if host not in host_keys:
+                # Only the key exchange is needed to get the host key, not a login
+                with Transport((host, 22)) as transport:
+                    transport.start_client(timeout=5)
+                    host_keys[host] = transport.get_remote_server_key()
+
+        known_hosts_keys = HostKeys()
+        for host in hosts:
+            known_hosts_keys.add(host, host_keys[host].get_name(), host_keys[host])
+
+        known_hosts_file = cache_dir / "_".join(hosts)
+        known_hosts_keys.save(str(known_hosts_file))
+        return str(known_hosts_file)
+
+    return known_hosts
+
+
+@pytest.fixture(scope="session", autouse=True)
+def ssh_connection_pool():
+    # Close any connections left in the pool by tests that enable pooling
+    yield
+    ssh_pool.close_all()
 
 
 @pytest.fixture(scope="session")
@@ -176,27 +265,8 @@ def ssh_key_file(setup_ssh_keys):
 
 @pytest.fixture(scope="session")
 def setup_sftp_keys(
-    docker_services, root_dir, test_directories, sftp_1, sftp_2
+    docker_services, root_dir, ssh_private_key_file, sftp_1, sftp_2
 ) -> None:
-    # Run command locally
-    # if ssh key doesn't exist yet
-    ssh_private_key_file = f"{root_dir}/testFiles/id_rsa"
-    # Load the ssh key and validate it
-    from paramiko import RSAKey
-
-    key = None
-    with contextlib.suppress(Exception):
-        key = RSAKey.from_private_key_file(ssh_private_key_file)
-
-    if not os.path.isfile(ssh_private_key_file) or not key:
-        # If it exists, delete it first
-        if os.path.isfile(ssh_private_key_file):
-            os.remove(ssh_private_key_file)
-        # Generate the key
-        subprocess.run(
-            ["ssh-keygen", "-t", "rsa", "-N", "", "-f", ssh_private_key_file]
-        ).returncode
-
     # Copy the file into the ssh directory for each host
     for i in ["1", "2"]:
         shutil.copy(ssh_private_key_file, f"{root_dir}/testFiles/sftp_{i}/ssh/id_rsa")
@@ -205,15 +275,6 @@ def setup_sftp_keys(
             f"{root_dir}/testFiles/sftp_{i}/ssh/authorized_keys",
         )
 
-    # Copy the file into the ssh directory on this host
-    # Current user's home directory
-    home_dir = os.path.expanduser("~")
-    # Make the .ssh directory if it doesn't exist
-    if not os.path.isdir(f"{home_dir}/.ssh"):
-        os.mkdir(f"{home_dir}/.ssh")
-
-    shutil.copy(ssh_private_key_file, f"{home_dir}/.ssh/id_rsa")
-
     # Run the docker exec command to create the user
     # Get the current uid for the running process
     uid = str(os.getuid())
@@ -231,9 +292,12 @@ def setup_sftp_keys(
         ("chmod", "-R", "700", "/home/application/.ssh"),
         ("mkdir", "-p", "/sftp/application"),
     ]
-    for host in ["sftp_1", "sftp_2"]:
-        for command in commands:
-            docker_services.execute(host, *command)
+    _run_on_hosts(
+        docker_services,
+        ["sftp_1", "sftp_2"],
+        commands,
+        skip_if=_already_set_up(uid, "/home/application/testFiles/ssh"),
+    )
 
 
 @pytest.fixture(scope="session")
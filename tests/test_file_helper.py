@@ -1,5 +1,5 @@
 # pylint: skip-file
-from tests.file_helper import list_test_files, write_test_file
+from tests.file_helper import list_test_files, write_test_file, write_test_files
 
 
 def test_write_test_file_with_content(tmpdir):
@@ -18,6 +18,23 @@ def test_write_test_file_with_length(tmpdir):
         assert len(f.read()) == length
 
 
+def test_write_test_file_overwrite_and_append(tmpdir):
+    file_name = f"{tmpdir}/test.txt"
+    write_test_file(file_name, "test1234")
+    write_test_file(file_name, "1234")
+    write_test_file(file_name, b"5678", mode="ab")
+    with open(file_name) as f:
+        assert f.read() == "12345678"
+
+
+def test_write_test_files(tmpdir):
+    files = {f"{tmpdir}/sub/test_{i}.txt": f"test{i}" for i in range(3)}
+    write_test_files(files)
+    for file_name, content in files.items():
+        with open(file_name) as f:
+            assert f.read() == content
+
+
 def test_list_test_files(tmpdir):
     file_name = f"{tmpdir}/test.txt"
     content = "test1234"
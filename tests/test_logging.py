@@ -105,6 +105,28 @@ def test_define_log_file_name(env_vars, tmpdir, top_level_root_dir):
     )
 
 
+def test_define_log_file_name_cache(env_vars):
+    # Repeated calls with the same environment should hit the cache
+    os.environ["OTF_LOG_RUN_PREFIX"] = "cached"
+    opentaskpy.otflogging._build_log_file_name.cache_clear()
+    first = opentaskpy.otflogging._define_log_file_name("123", "B")
+    assert first == opentaskpy.otflogging._define_log_file_name("123", "B")
+    assert opentaskpy.otflogging._build_log_file_name.cache_info().hits == 1
+
+    # Changing the prefix must not return the previously cached name
+    os.environ["OTF_LOG_RUN_PREFIX"] = "cached_2"
+    assert (
+        opentaskpy.otflogging._define_log_file_name("123", "B")
+        == "logs/123/cached_2_B_running.log"
+    )
+
+    # Removing the prefix generates a new one, rather than reusing the cached one
+    del os.environ["OTF_LOG_RUN_PREFIX"]
+    assert "cached" not in opentaskpy.otflogging._define_log_file_name("123", "B")
+
+    del os.environ["OTF_LOG_RUN_PREFIX"]
+
+
 def test_init_logging(env_vars, top_level_root_dir):
     # Call init logging function and ensure that the returned logger includes a TaskFileHandler
     # pointing at the correct filename
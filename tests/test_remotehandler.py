@@ -3,6 +3,7 @@
 
 import pytest
 
+from opentaskpy.remotehandlers.remotehandler import compile_regex
 from opentaskpy.remotehandlers.ssh import SSHTransfer
 
 
@@ -27,3 +28,14 @@ def test_cacheable_variable_dotted_notation_array():
     rh = SSHTransfer(spec)
 
     assert rh.obtain_variable_from_spec("invalidParam[2]", spec) == "3"
+
+
+def test_compile_regex_cache():
+    compile_regex.cache_clear()
+
+    pattern = compile_regex(".*taskhandler.*\\.txt")
+    assert pattern.match("test.taskhandler.txt")
+
+    # The same pattern should come back from the cache, rather than being recompiled
+    assert compile_regex(".*taskhandler.*\\.txt") is pattern
+    assert compile_regex.cache_info().hits == 1
@@ -9,6 +9,7 @@ import random
 import subprocess
 import threading
 import time
+from pathlib import Path
 
 import pytest
 from pytest_shell import fs
@@ -172,8 +173,7 @@ def test_noop_binary(env_vars, setup_ssh_keys, root_dir):
     # Pass noop argument to the binary
 
     # Delete the destination file in case something else copied it
-    if os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/noop_test.txt"):
-        os.remove(f"{root_dir}/testFiles/ssh_2/dest/noop_test.txt")
+    Path(f"{root_dir}/testFiles/ssh_2/dest/noop_test.txt").unlink(missing_ok=True)
 
     # Create a test file
     fs.create_files(
@@ -193,8 +193,7 @@ def test_noop_binary(env_vars, setup_ssh_keys, root_dir):
     # Use the touch example
     touched_file = f"{root_dir}/testFiles/ssh_1/src/touchedFile.txt"
     # Delete if it already exists
-    if os.path.exists(touched_file):
-        os.remove(touched_file)
+    Path(touched_file).unlink(missing_ok=True)
 
     assert run_task_run("touch", noop=True)["returncode"] == 0
     # Verify the file still doesn't exist
@@ -565,8 +564,7 @@ def test_scp_file_watch(env_vars, setup_ssh_keys, root_dir):
     )
 
     # Ensure the source file doesn't exist
-    if os.path.exists(f"{root_dir}/testFiles/ssh_1/src/fileWatch.txt"):
-        os.remove(f"{root_dir}/testFiles/ssh_1/src/fileWatch.txt")
+    Path(f"{root_dir}/testFiles/ssh_1/src/fileWatch.txt").unlink(missing_ok=True)
 
     # Filewatch configured to wait 15 seconds before giving up. Expect it to fail
     task_runner = taskrun.TaskRun("scp-file-watch", "test/cfg")
@@ -599,8 +597,7 @@ def test_scp_log_watch(env_vars, setup_ssh_keys, root_dir):
     year = datetime.datetime.now().year
     # Ensure the log file is removed
     log_file = f"{root_dir}/testFiles/ssh_1/src/log{year}Watch.log"
-    if os.path.exists(log_file):
-        os.remove(log_file)
+    Path(log_file).unlink(missing_ok=True)
 
     # Logwatch will fail if the log file doesn't exist
     task_runner = taskrun.TaskRun("scp-log-watch", "test/cfg")
@@ -634,8 +631,7 @@ def test_scp_log_watch_tail(env_vars, setup_ssh_keys, root_dir):
     year = datetime.datetime.now().year
 
     # Ensure the log file is removed
-    if os.path.exists(f"{root_dir}/testFiles/ssh_1/src/log{year}Watch1.log"):
-        os.remove(f"{root_dir}/testFiles/ssh_1/src/log{year}Watch1.log")
+    Path(f"{root_dir}/testFiles/ssh_1/src/log{year}Watch1.log").unlink(missing_ok=True)
 
     # Write the matching pattern into the log, but before it runs.. This should
     # make the task fail because the pattern isn't written after the task starts
@@ -523,8 +523,8 @@ def test_batch_resume_after_failure_retry_successful_tasks(
     )
 
     # Check the task_order_tree to check both tasks have a NOT_STARTED state
-    assert batch_obj.task_order_tree[1]["status"], "NOT_STARTED"
-    assert batch_obj.task_order_tree[2]["status"], "NOT_STARTED"
+    assert batch_obj.task_order_tree[1]["status"] == "NOT_STARTED"
+    assert batch_obj.task_order_tree[2]["status"] == "NOT_STARTED"
 
     # Run and expect a false status
     assert not batch_obj.run()
@@ -1,6 +1,9 @@
 # pylint: skip-file
 # ruff: noqa
 import os
+import subprocess
+import sys
+from pathlib import Path
 
 import pytest
 
@@ -11,50 +14,60 @@ from tests.fixtures.ssh_clients import *  # noqa: F403
 os.environ["OTF_NO_LOG"] = "1"
 os.environ["OTF_LOG_LEVEL"] = "DEBUG"
 
-local_test_dir = "/tmp/local_tests"
-
-# Create a task definition
-touch_task_definition = {
-    "type": "execution",
-    "directory": "/tmp",
-    "command": f"touch {local_test_dir}/dest/execution.txt",
-    "protocol": {"name": "local"},
-}
-
-fail_task_definition = {
-    "type": "execution",
-    "directory": "/tmp",
-    "command": f"test -e {local_test_dir}/src/execution.test.fail.txt",
-    "protocol": {"name": "local"},
-}
-
-fail_host_task_definition = {
-    "type": "execution",
-    "directory": "/tmp",
-    "command": f"touch {local_test_dir}/dest/execution.invalidhost.txt",
-    "protocol": {"name": "local"},
-}
-
-fail_invalid_protocol_task_definition = {
-    "type": "execution",
-    "directory": "/tmp",
-    "command": f"touch {local_test_dir}/dest/execution.invalidhost.txt",
-    "protocol": {"name": "rubbish"},
-}
+
+# Task definitions are built from the test directory, so that each session (and each
+# xdist worker) gets its own isolated copy
+def touch_task_definition(local_test_dir):
+    return {
+        "type": "execution",
+        "directory": "/tmp",
+        "command": f"touch {local_test_dir}/dest/execution.txt",
+        "protocol": {"name": "local"},
+    }
+
+
+def fail_task_definition(local_test_dir):
+    return {
+        "type": "execution",
+        "directory": "/tmp",
+        "command": f"test -e {local_test_dir}/src/execution.test.fail.txt",
+        "protocol": {"name": "local"},
+    }
+
+
+def fail_host_task_definition(local_test_dir):
+    return {
+        "type": "execution",
+        "directory": "/tmp",
+        "command": f"touch {local_test_dir}/dest/execution.invalidhost.txt",
+        "protocol": {"name": "local"},
+    }
+
+
+def fail_invalid_protocol_task_definition(local_test_dir):
+    return {
+        "type": "execution",
+        "directory": "/tmp",
+        "command": f"touch {local_test_dir}/dest/execution.invalidhost.txt",
+        "protocol": {"name": "rubbish"},
+    }
 
 
 @pytest.fixture(scope="session")
-def setup_local_test_dir():
-    os.makedirs(f"{local_test_dir}/src", exist_ok=True)
-    os.makedirs(f"{local_test_dir}/dest", exist_ok=True)
-    os.makedirs(f"{local_test_dir}/archive", exist_ok=True)
+def setup_local_test_dir(tmp_path_factory):
+    local_test_dir = tmp_path_factory.mktemp("local_tests")
+    (local_test_dir / "src").mkdir()
+    (local_test_dir / "dest").mkdir()
+    (local_test_dir / "archive").mkdir()
 
-    return local_test_dir
+    return str(local_test_dir)
 
 
-def test_invalid_protocol():
+def test_invalid_protocol(setup_local_test_dir):
     execution_obj = execution.Execution(
-        None, "invalid-protocol", fail_invalid_protocol_task_definition
+        None,
+        "invalid-protocol",
+        fail_invalid_protocol_task_definition(setup_local_test_dir),
     )
     # Expect a UnknownProtocolError exception
     with pytest.raises(exceptions.UnknownProtocolError):
@@ -62,12 +75,13 @@ def test_invalid_protocol():
 
 
 def test_basic_execution(setup_local_test_dir):
-    execution_obj = execution.Execution(None, "df-basic", touch_task_definition)
+    local_test_dir = setup_local_test_dir
+    task_definition = touch_task_definition(local_test_dir)
+    execution_obj = execution.Execution(None, "df-basic", task_definition)
     execution_obj._set_remote_handlers()
 
     # Ensure no test files exist already, if so delete them
-    if os.path.exists(f"{local_test_dir}/dest/execution.txt"):
-        os.remove(f"{local_test_dir}/dest/execution.txt")
+    Path(f"{local_test_dir}/dest/execution.txt").unlink(missing_ok=True)
 
     # Validate some things were set as expected
     assert execution_obj.remote_handlers[0].__class__.__name__ == "LocalExecution"
@@ -78,9 +92,14 @@ def test_basic_execution(setup_local_test_dir):
     # Check the destination file exists on both hosts
     assert os.path.exists(f"{local_test_dir}/dest/execution.txt")
 
+    # The task definition passed in should not have been modified
+    assert task_definition == touch_task_definition(local_test_dir)
+
 
 def test_basic_execution_cmd_failure(setup_local_test_dir):
-    execution_obj = execution.Execution(None, "task-fail", fail_task_definition)
+    execution_obj = execution.Execution(
+        None, "task-fail", fail_task_definition(setup_local_test_dir)
+    )
     execution_obj._set_remote_handlers()
 
     # Validate some things were set as expected
@@ -89,3 +108,16 @@ def test_basic_execution_cmd_failure(setup_local_test_dir):
     # Run the execution and expect a failure
 
     assert not execution_obj.run()
+
+
+def test_local_execution_does_not_import_paramiko(setup_local_test_dir):
+    # Use a fresh interpreter, as other tests in the session will have loaded paramiko
+    script = f"""
+import sys
+from opentaskpy.taskhandlers import execution
+execution_obj = execution.Execution(None, "no-paramiko", {touch_task_definition(setup_local_test_dir)!r})
+assert execution_obj.run()
+assert "paramiko" not in sys.modules
+"""
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True)
+    assert result.returncode == 0, result.stderr.decode()
@@ -1,7 +1,9 @@
 # pylint: skip-file
 # ruff: noqa
 import os
-from copy import deepcopy
+import shutil
+from pathlib import Path
+from types import MappingProxyType
 
 import pytest
 from pytest_shell import fs
@@ -13,38 +15,57 @@ from tests.fixtures.ssh_clients import *  # noqa: F403
 os.environ["OTF_NO_LOG"] = "1"
 os.environ["OTF_LOG_LEVEL"] = "DEBUG"
 
+
+def _freeze(definition):
+    # Make shared task definitions read only, so that no test (or task handler) can
+    # modify them for the tests that follow
+    if isinstance(definition, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in definition.items()})
+    if isinstance(definition, list):
+        return tuple(_freeze(v) for v in definition)
+    return definition
+
+
 # Create a task definition
-touch_task_definition = {
-    "type": "execution",
-    "hosts": ["172.16.0.11", "172.16.0.12"],
-    "directory": "/tmp",
-    "command": "touch /tmp/testFiles/dest/execution.txt",
-    "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-}
-
-fail_task_definition = {
-    "type": "execution",
-    "hosts": ["172.16.0.11", "172.16.0.12"],
-    "directory": "/tmp",
-    "command": "test -e /tmp/testFiles/src/execution.test.fail.txt",
-    "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-}
-
-fail_host_task_definition = {
-    "type": "execution",
-    "hosts": ["172.16.0.11", "172.16.255.12"],
-    "directory": "/tmp",
-    "command": "touch /tmp/testFiles/dest/execution.invalidhost.txt",
-    "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-}
-
-fail_invalid_protocol_task_definition = {
-    "type": "execution",
-    "hosts": ["172.16.0.11", "172.16.255.12"],
-    "directory": "/tmp",
-    "command": "touch /tmp/testFiles/dest/execution.invalidhost.txt",
-    "protocol": {"name": "rubbish"},
-}
+touch_task_definition = _freeze(
+    {
+        "type": "execution",
+        "hosts": ["172.16.0.11", "172.16.0.12"],
+        "directory": "/tmp",
+        "command": "touch /tmp/testFiles/dest/execution.txt",
+        "protocol": {"name": "ssh", "credentials": {"username": "application"}},
+    }
+)
+
+fail_task_definition = _freeze(
+    {
+        "type": "execution",
+        "hosts": ["172.16.0.11", "172.16.0.12"],
+        "directory": "/tmp",
+        "command": "test -e /tmp/testFiles/src/execution.test.fail.txt",
+        "protocol": {"name": "ssh", "credentials": {"username": "application"}},
+    }
+)
+
+fail_host_task_definition = _freeze(
+    {
+        "type": "execution",
+        "hosts": ["172.16.0.11", "172.16.255.12"],
+        "directory": "/tmp",
+        "command": "touch /tmp/testFiles/dest/execution.invalidhost.txt",
+        "protocol": {"name": "ssh", "credentials": {"username": "application"}},
+    }
+)
+
+fail_invalid_protocol_task_definition = _freeze(
+    {
+        "type": "execution",
+        "hosts": ["172.16.0.11", "172.16.255.12"],
+        "directory": "/tmp",
+        "command": "touch /tmp/testFiles/dest/execution.invalidhost.txt",
+        "protocol": {"name": "rubbish"},
+    }
+)
 
 
 def test_invalid_protocol():
@@ -61,11 +82,9 @@ def test_basic_execution(setup_ssh_keys, root_dir):
     execution_obj._set_remote_handlers()
 
     # Ensure no test files exist already, if so delete them
-    if os.path.exists(f"{root_dir}/testFiles/ssh_1/dest/execution.txt"):
-        os.remove(f"{root_dir}/testFiles/ssh_1/dest/execution.txt")
+    Path(f"{root_dir}/testFiles/ssh_1/dest/execution.txt").unlink(missing_ok=True)
 
-    if os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/execution.txt"):
-        os.remove(f"{root_dir}/testFiles/ssh_2/dest/execution.txt")
+    Path(f"{root_dir}/testFiles/ssh_2/dest/execution.txt").unlink(missing_ok=True)
 
     # Validate some things were set as expected
     assert execution_obj.remote_handlers[0].__class__.__name__ == "SSHExecution"
@@ -80,16 +99,40 @@ def test_basic_execution(setup_ssh_keys, root_dir):
     assert os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/execution.txt")
 
 
-def test_basic_execution_host_key_validation(setup_ssh_keys, root_dir):
+def test_basic_execution_connection_pool(setup_ssh_keys, root_dir, monkeypatch):
+    monkeypatch.setenv("OTF_SSH_CONNECTION_POOL", "1")
+
+    # Run the same execution twice, the second run should reuse the connections
+    execution_obj = execution.Execution(None, "df-pooled", touch_task_definition)
+    assert execution_obj.run()
+    first_clients = [handler.ssh_client for handler in execution_obj.remote_handlers]
+
+    execution_obj = execution.Execution(None, "df-pooled", touch_task_definition)
+    assert execution_obj.run()
+    second_clients = [handler.ssh_client for handler in execution_obj.remote_handlers]
+
+    for first, second in zip(first_clients, second_clients):
+        assert first is second
+        assert first.get_transport().is_active()
+
+    # Each host should still get its own connection
+    assert first_clients[0] is not first_clients[1]
+
+
+def test_basic_execution_host_key_validation(
+    setup_ssh_keys, root_dir, known_hosts_cache
+):
     # Run the above test again, but this time with host key validation
-    ssh_validation_task_definition = deepcopy(touch_task_definition)
-    ssh_validation_task_definition["protocol"]["hostKeyValidation"] = True
+    # Only the protocol is changed, so the rest of the definition can be shared
+    ssh_validation_task_definition = {
+        **touch_task_definition,
+        "protocol": {**touch_task_definition["protocol"], "hostKeyValidation": True},
+    }
 
     # Delete the known hosts file if it exists
     user_home = os.path.expanduser("~")
     known_hosts_file = f"{user_home}/.ssh/known_hosts"
-    if os.path.exists(known_hosts_file):
-        os.remove(known_hosts_file)
+    Path(known_hosts_file).unlink(missing_ok=True)
 
     execution_obj = execution.Execution(
         None, "ssh-host-key-validation", ssh_validation_task_definition
@@ -102,10 +145,8 @@ def test_basic_execution_host_key_validation(setup_ssh_keys, root_dir):
     for _ in range(10):
         execution_obj.logger.info("")
 
-    # SSH onto the host manually and accept the host key so it's saved to the system known hosts
-    cmd = "ssh -o StrictHostKeyChecking=no application@172.16.0.11 echo 'test' && ssh -o StrictHostKeyChecking=no application@172.16.0.12 echo 'test' "
-    result = subprocess.run(cmd, shell=True, capture_output=True)
-    assert result.returncode == 0
+    # Restore the host keys cached for the session, as if they had been accepted manually
+    shutil.copy(known_hosts_cache("172.16.0.11", "172.16.0.12"), known_hosts_file)
 
     # Now rerun the execution, but this time it should work
     assert execution_obj.run()
@@ -154,8 +195,9 @@ def test_basic_execution_invalid_host(setup_ssh_keys, root_dir):
     execution_obj = execution.Execution(None, "task-fail", fail_host_task_definition)
     execution_obj._set_remote_handlers()
     # Remove test files if they exist
-    if os.path.exists(f"{root_dir}/testFiles/ssh_1/dest/execution.invalidhost.txt"):
-        os.remove(f"{root_dir}/testFiles/ssh_1/dest/execution.invalidhost.txt")
+    Path(f"{root_dir}/testFiles/ssh_1/dest/execution.invalidhost.txt").unlink(
+        missing_ok=True
+    )
 
     # Validate some things were set as expected
     assert execution_obj.remote_handlers[0].__class__.__name__ == "SSHExecution"
@@ -1,41 +1,55 @@
 # pylint: skip-file
 # ruff: noqa
 import os
-from copy import deepcopy
+from types import MappingProxyType
 
 import pytest
 
 from opentaskpy.exceptions import FilesDoNotMeetConditionsError
 from opentaskpy.taskhandlers import transfer
 
-dummy_task_definition = {
-    "type": "transfer",
-    "source": {
-        "taskId": 123,
-        "accessToken": "0",
-        "protocol": {"name": "dummy"},
-        "cacheableVariables": [
-            {
-                "variableName": "accessToken",
-                "cachingPlugin": "file",
-                "cacheArgs": {
-                    "file": "/tmp/cacheable_variable.txt",
-                },
-            }
-        ],
-    },
-}
+# Shared by every test, so it's never modified. Each test builds the parts it changes
+# (and the source spec, which the handlers write to) as new dicts
+dummy_task_definition = MappingProxyType(
+    {
+        "type": "transfer",
+        "source": {
+            "taskId": 123,
+            "accessToken": "0",
+            "protocol": {"name": "dummy"},
+            "cacheableVariables": [
+                {
+                    "variableName": "accessToken",
+                    "cachingPlugin": "file",
+                    "cacheArgs": {
+                        "file": "/tmp/cacheable_variable.txt",
+                    },
+                }
+            ],
+        },
+    }
+)
+
+
+def _task_definition(cacheable_variable):
+    source = dummy_task_definition["source"]
+    return {
+        **dummy_task_definition,
+        "source": {
+            **source,
+            "cacheableVariables": [
+                {**source["cacheableVariables"][0], **cacheable_variable}
+            ],
+        },
+    }
 
 
 def test_dummy_transfer_cacheable_invalid_variable_name():
     from opentaskpy.remotehandlers.dummy import DummyTransfer
 
-    # Copy the task definition
-    dummy_task_definition_copy = deepcopy(dummy_task_definition)
-
-    dummy_task_definition_copy["source"]["cacheableVariables"][0][
-        "variableName"
-    ] = "print('something_bad')"
+    dummy_task_definition_copy = _task_definition(
+        {"variableName": "print('something_bad')"}
+    )
 
     with pytest.raises(ValueError) as e:
         DummyTransfer(dummy_task_definition_copy["source"])
@@ -51,11 +65,9 @@ def test_dummy_transfer(tmpdir):
     #  is written to the cache file
     from opentaskpy.remotehandlers.dummy import DummyTransfer
 
-    dummy_task_definition_copy = deepcopy(dummy_task_definition)
-
-    dummy_task_definition_copy["source"]["cacheableVariables"][0]["cacheArgs"][
-        "file"
-    ] = f"{tmpdir}/cacheable_variable.txt"
+    dummy_task_definition_copy = _task_definition(
+        {"cacheArgs": {"file": f"{tmpdir}/cacheable_variable.txt"}}
+    )
 
     dummy_transfer_obj = transfer.Transfer(
         None, "dummy-transfer", dummy_task_definition_copy
@@ -2,46 +2,135 @@
 # ruff: noqa
 import json
 import os
+from types import MappingProxyType
 
-from pytest_shell import fs
+import pytest
 
 from opentaskpy.config.loader import ConfigLoader
 from opentaskpy.taskhandlers import transfer
+from tests.file_helper import write_test_files
 from tests.fixtures.ssh_clients import *  # noqa: F403
+from tests.fixtures.ssh_clients import create_variable_lookup_files
 
 os.environ["OTF_NO_LOG"] = "1"
 os.environ["OTF_LOG_LEVEL"] = "DEBUG"
 
-# Create a task definition
-email_task_definition = {
-    "type": "transfer",
-    "source": {
-        "hostname": "172.16.0.11",
-        "directory": "/tmp/testFiles/src",
-        "fileRegex": ".*emailhandler.*\\.txt",
-        "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-    },
-    "destination": [
-        {
-            "recipients": ["test@example.com", "test1@example.com"],
-            "subject": "Test Email Subject",
-            "protocol": {
-                "name": "email",
-                "credentials": {
-                    "username": "{{ lookup('file', path='/tmp/smtp_username') }}",
-                    "password": "{{ lookup('file', path='/tmp/smtp_password') }}",
+# Create a task definition. It's shared by every test, so it's never modified.
+# Tests build the parts they change, or that Transfer writes the task_id into, with
+# _email_task_definition
+email_task_definition = MappingProxyType(
+    {
+        "type": "transfer",
+        "source": {
+            "hostname": "172.16.0.11",
+            "directory": "/tmp/testFiles/src",
+            "fileRegex": ".*emailhandler.*\\.txt",
+            "protocol": {"name": "ssh", "credentials": {"username": "application"}},
+        },
+        "destination": [
+            {
+                "recipients": ["test@example.com", "test1@example.com"],
+                "subject": "Test Email Subject",
+                "protocol": {
+                    "name": "email",
+                    "credentials": {
+                        "username": "{{ lookup('file', path='/tmp/smtp_username') }}",
+                        "password": "{{ lookup('file', path='/tmp/smtp_password') }}",
+                    },
+                    "sender": "Test Sender <test@example.com>",
                 },
-                "sender": "Test Sender <test@example.com>",
             },
-        },
-    ],
-}
+        ],
+    }
+)
+
+
+def _email_task_definition(**destination_overrides):
+    return {
+        **email_task_definition,
+        "source": {**email_task_definition["source"]},
+        "destination": [
+            {**email_task_definition["destination"][0], **destination_overrides}
+        ],
+    }
+
+
+@pytest.fixture(scope="module")
+def smtp_credentials(tmp_path_factory):
+    # Outside of GitHub Actions, the credentials must already be in /tmp
+    if not os.getenv("GITHUB_ACTIONS"):
+        return {"username": "/tmp/smtp_username", "password": "/tmp/smtp_password"}
+
+    # In GitHub Actions, the variables we need are in the environment. Write them to
+    # a directory of our own, rather than sharing files in /tmp with other tests
+    credentials_dir = tmp_path_factory.mktemp("smtp")
+    credentials = {
+        "username": str(credentials_dir / "smtp_username"),
+        "password": str(credentials_dir / "smtp_password"),
+    }
+    write_test_files(
+        {
+            credentials["username"]: os.getenv("SMTP_USERNAME"),
+            credentials["password"]: os.getenv("SMTP_PASSWORD"),
+        }
+    )
+    return credentials
+
+
+@pytest.fixture(scope="module")
+def email_task_definition_json(smtp_credentials):
+    # Point the credential lookups at the files from smtp_credentials, and serialise
+    # the definition once, for the tests that resolve it through the config
+    destination = email_task_definition["destination"][0]
+    credentials = {
+        name: f"{{{{ lookup('file', path='{path}') }}}}"
+        for name, path in smtp_credentials.items()
+    }
+    return json.dumps(
+        _email_task_definition(
+            protocol={**destination["protocol"], "credentials": credentials}
+        )
+    )
+
+
+@pytest.fixture(scope="module")
+def email_source_file(root_dir):
+    # The email transfer doesn't move or delete its source, so it only needs creating
+    # once
+    source_file = f"{root_dir}/testFiles/ssh_1/src/emailhandler.txt"
+    write_test_files({source_file: "test1234"})
+    return source_file
+
+
+@pytest.fixture(scope="module")
+def config_loader():
+    # This runs before the function scoped env_vars fixture, so the files the config
+    # looks up need creating here
+    create_variable_lookup_files()
+    return ConfigLoader("test/cfg")
+
+
+@pytest.fixture(scope="module")
+def global_variables(config_loader):
+    global_variables = config_loader.get_global_variables()
+    global_variables["global_protocol_vars"] = [
+        {"name": "email", "smtp_port": 587, "smtp_server": "smtp.gmail.com"}
+    ]
+    return global_variables
+
+
+def _resolve_task_definition(config_loader, task_definition_json):
+    # Resolve templated values the same way load_task_definition does, without having
+    # to write the definition into test/cfg and remove it again afterwards
+    return json.loads(
+        config_loader._resolve_templated_variables_from_string(task_definition_json)
+    )
 
 
 def test_remote_handler():
     # Validate that given a transfer with email protocol, that we get a remote handler of type EmailTransfer
 
-    transfer_obj = transfer.Transfer(None, "email-basic", email_task_definition)
+    transfer_obj = transfer.Transfer(None, "email-basic", _email_task_definition())
 
     transfer_obj._set_remote_handlers()
 
@@ -55,16 +144,9 @@ def test_remote_handler():
     assert transfer_obj.dest_remote_handlers[0].__class__.__name__ == "EmailTransfer"
 
 
-def test_remote_handler_vars(env_vars):
-    # Load the global config
-    config_loader = ConfigLoader("test/cfg")
-    global_variables = config_loader.get_global_variables()
-    global_variables["global_protocol_vars"] = [
-        {"name": "email", "smtp_port": 587, "smtp_server": "smtp.gmail.com"}
-    ]
-
+def test_remote_handler_vars(env_vars, global_variables):
     transfer_obj = transfer.Transfer(
-        global_variables, "email-basic", email_task_definition
+        global_variables, "email-basic", _email_task_definition()
     )
     transfer_obj._set_remote_handlers()
 
@@ -84,7 +166,24 @@ def test_remote_handler_vars(env_vars):
     )
 
 
-def test_email_transfer(env_vars, setup_ssh_keys, root_dir):
+# Sending a real email needs SMTP credentials. On GitHub Actions they come from the
+# environment, otherwise they must already be in the files the task looks up. Skip via a
+# marker, so the SSH fixtures aren't set up for nothing
+@pytest.mark.skipif(
+    not os.getenv("GITHUB_ACTIONS")
+    and not (
+        os.path.exists("/tmp/smtp_username") and os.path.exists("/tmp/smtp_password")
+    ),
+    reason="SMTP credentials are not available",
+)
+def test_email_transfer(
+    env_vars,
+    setup_ssh_keys,
+    config_loader,
+    global_variables,
+    email_task_definition_json,
+    email_source_file,
+):
 
     import logging
 
@@ -94,51 +193,11 @@ def test_email_transfer(env_vars, setup_ssh_keys, root_dir):
         __name__, "email-transfer", level=logging.DEBUG, override_root_logger=True
     )
 
-    # In GitHub Actions, the variables we need are in the environment
-    # Pull those and write them to the config files first
-    if os.getenv("GITHUB_ACTIONS"):
-        # Get SMTP_USERNAME and SMTP_PASSWORD from environment and write them to files under /tmp
-        fs.create_files(
-            [
-                {
-                    "/tmp/smtp_username": {
-                        "content": os.getenv("SMTP_USERNAME"),
-                    }
-                },
-                {
-                    "/tmp/smtp_password": {
-                        "content": os.getenv("SMTP_PASSWORD"),
-                    }
-                },
-            ]
-        )
-
-    # Create a file to transfer
-    fs.create_files(
-        [{f"{root_dir}/testFiles/ssh_1/src/emailhandler.txt": {"content": "test1234"}}]
+    # Resolve the templated values for username and password
+    imported_task_def = _resolve_task_definition(
+        config_loader, email_task_definition_json
     )
 
-    # Write the email_task_definition to a file which we will read in to resolve the templated values for username and password
-    task_definition_file = f"{root_dir}/cfg/transfers/email-transfer.json"
-    # Delete the file if it exists
-    if os.path.exists(task_definition_file):
-        os.remove(task_definition_file)
-
-    fs.create_files(
-        [{task_definition_file: {"content": json.dumps(email_task_definition)}}]
-    )
-
-    # Load the global config
-    config_loader = ConfigLoader("test/cfg")
-    global_variables = config_loader.get_global_variables()
-    global_variables["global_protocol_vars"] = [
-        {"name": "email", "smtp_port": 587, "smtp_server": "smtp.gmail.com"}
-    ]
-
-    # Load the task definition using the config_loader
-    imported_task_def = config_loader.load_task_definition("email-transfer")
-    os.remove(task_definition_file)
-
     transfer_obj = transfer.Transfer(
         global_variables, "email-transfer", imported_task_def
     )
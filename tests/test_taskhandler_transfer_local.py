@@ -1,16 +1,25 @@
 # pylint: skip-file
 # ruff: noqa
-import hashlib
+import filecmp
+import glob
 import os
-import random
-from copy import deepcopy
+import shutil
+import stat
+import zlib
+from pathlib import Path
+from types import MappingProxyType, SimpleNamespace
 
 import gnupg
 import pytest
-from pytest_shell import fs
 
 from opentaskpy import exceptions
 from opentaskpy.taskhandlers import transfer
+from tests.file_helper import (
+    clone_task_definition,
+    empty_directory,
+    list_directory,
+    write_test_files,
+)
 from tests.fixtures.pgp import *  # noqa: F403, F401
 from tests.fixtures.ssh_clients import *  # noqa: F403, F401
 
@@ -18,305 +27,362 @@ os.environ["OTF_NO_LOG"] = "1"
 os.environ["OTF_LOG_LEVEL"] = "DEBUG"
 
 
-local_test_dir = "/tmp/local_tests"
+# The encryption tests all shell out to gpg, so skip them straight away without it
+requires_gpg = pytest.mark.skipif(
+    shutil.which("gpg") is None, reason="gpg not installed"
+)
 
-# Create a task definition
-local_task_definition = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": ".*taskhandler.*\\.txt",
-        "protocol": {"name": "local"},
-    },
-    "destination": [
-        {
-            "directory": f"{local_test_dir}/dest",
+
+# Task definitions are built from the test directories, so that each session (and
+# each xdist worker) gets its own copy
+def local_file_watch_task_no_error_definition(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": ".*nofileexists.*\\.txt",
+            # Only the outcome matters, so check once rather than waiting for the file
+            "fileWatch": {"timeout": 0},
+            "error": False,
             "protocol": {"name": "local"},
-            "mode": "0644",
         },
-    ],
-}
-
-local_file_watch_task_no_error_definition = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": ".*nofileexists.*\\.txt",
-        "fileWatch": {"timeout": 1},
-        "error": False,
-        "protocol": {"name": "local"},
-    },
-}
-
-local_with_fin_task_definition = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": ".*taskhandler.fin.*\\.txt",
-        "protocol": {"name": "local"},
-    },
-    "destination": [
-        {
-            "directory": f"{local_test_dir}/dest",
-            "flags": {
-                "fullPath": f"{local_test_dir}/dest/sftp_with_fin.fin",
-            },
+    }
+
+
+def local_with_fin_task_definition(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": ".*taskhandler.fin.*\\.txt",
             "protocol": {"name": "local"},
         },
-    ],
-}
+        "destination": [
+            {
+                "directory": str(dirs.dest),
+                "flags": {
+                    "fullPath": str(dirs.dest / "sftp_with_fin.fin"),
+                },
+                "protocol": {"name": "local"},
+            },
+        ],
+    }
+
 
 # PCA delete
-local_pca_delete_task_definition_1 = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": "pca_delete\\.txt",
-        "protocol": {"name": "local"},
-        "postCopyAction": {
-            "action": "delete",
-        },
-    },
-    "destination": [
-        {
-            "directory": f"{local_test_dir}/dest",
+def local_pca_delete_task_definition_1(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": "pca_delete\\.txt",
             "protocol": {"name": "local"},
+            "postCopyAction": {
+                "action": "delete",
+            },
         },
-    ],
-}
+        "destination": [
+            {
+                "directory": str(dirs.dest),
+                "protocol": {"name": "local"},
+            },
+        ],
+    }
+
 
 # PCA move
-local_pca_move_task_definition_1 = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": "pca_move\\.txt",
-        "protocol": {"name": "local"},
-        "postCopyAction": {
-            "action": "move",
-            "destination": f"{local_test_dir}/archive",
-        },
-    },
-    "destination": [
-        {
-            "directory": f"{local_test_dir}/dest",
+def local_pca_move_task_definition_1(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": "pca_move\\.txt",
             "protocol": {"name": "local"},
+            "postCopyAction": {
+                "action": "move",
+                "destination": str(dirs.archive),
+            },
         },
-    ],
-}
+        "destination": [
+            {
+                "directory": str(dirs.dest),
+                "protocol": {"name": "local"},
+            },
+        ],
+    }
 
-local_pca_move_task_definition_2 = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": "pca_move_2\\.txt",
-        "protocol": {"name": "local"},
-        "postCopyAction": {
-            "action": "move",
-            "destination": f"{local_test_dir}/archive/",
-        },
-    },
-    "destination": [
-        {
-            "directory": f"{local_test_dir}/dest",
+
+def local_pca_move_task_definition_2(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": "pca_move_2\\.txt",
             "protocol": {"name": "local"},
+            "postCopyAction": {
+                "action": "move",
+                "destination": f"{dirs.archive}/",
+            },
         },
-    ],
-}
+        "destination": [
+            {
+                "directory": str(dirs.dest),
+                "protocol": {"name": "local"},
+            },
+        ],
+    }
 
-local_pca_invalid_move_task_definition = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": "pca_move_3\\.txt",
-        "protocol": {"name": "local"},
-        "postCopyAction": {
-            "action": "move",
-            "destination": f"{local_test_dir}/archive/pca_move_bad.txt",
-        },
-    },
-    "destination": [
-        {
-            "directory": f"{local_test_dir}/dest",
+
+def local_pca_invalid_move_task_definition(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": "pca_move_3\\.txt",
             "protocol": {"name": "local"},
+            "postCopyAction": {
+                "action": "move",
+                "destination": str(dirs.archive / "pca_move_bad.txt"),
+            },
         },
-    ],
-}
+        "destination": [
+            {
+                "directory": str(dirs.dest),
+                "protocol": {"name": "local"},
+            },
+        ],
+    }
 
-local_pca_invalid_move_dir_task_definition = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": "pca_move_4\\.txt",
-        "protocol": {"name": "local"},
-        "postCopyAction": {
-            "action": "move",
-            "destination": "/etc/passwd",
-        },
-    },
-    "destination": [
-        {
-            "directory": f"{local_test_dir}/dest",
+
+def local_pca_invalid_move_dir_task_definition(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": "pca_move_4\\.txt",
             "protocol": {"name": "local"},
+            "postCopyAction": {
+                "action": "move",
+                "destination": "/etc/passwd",
+            },
         },
-    ],
-}
+        "destination": [
+            {
+                "directory": str(dirs.dest),
+                "protocol": {"name": "local"},
+            },
+        ],
+    }
 
-local_pca_rename_task_definition_1 = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": "pca_rename_1\\.txt",
-        "protocol": {"name": "local"},
-        "postCopyAction": {
-            "action": "rename",
-            "destination": f"{local_test_dir}/archive/",
-            "pattern": "rename",
-            "sub": "renamed",
-        },
-    },
-    "destination": [
-        {
-            "directory": f"{local_test_dir}/dest",
+
+def local_pca_rename_task_definition_1(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": "pca_rename_1\\.txt",
             "protocol": {"name": "local"},
+            "postCopyAction": {
+                "action": "rename",
+                "destination": f"{dirs.archive}/",
+                "pattern": "rename",
+                "sub": "renamed",
+            },
         },
-    ],
-}
+        "destination": [
+            {
+                "directory": str(dirs.dest),
+                "protocol": {"name": "local"},
+            },
+        ],
+    }
 
-local_pca_rename_many_task_definition_1 = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": "pca_rename_many.*\\.txt",
-        "protocol": {"name": "local"},
-        "postCopyAction": {
-            "action": "rename",
-            "destination": f"{local_test_dir}/archive/",
-            "pattern": "rename",
-            "sub": "renamed",
-        },
-    },
-    "destination": [
-        {
-            "directory": f"{local_test_dir}/dest",
+
+def local_pca_rename_many_task_definition_1(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": "pca_rename_many.*\\.txt",
             "protocol": {"name": "local"},
+            "postCopyAction": {
+                "action": "rename",
+                "destination": f"{dirs.archive}/",
+                "pattern": "rename",
+                "sub": "renamed",
+            },
         },
-    ],
-}
+        "destination": [
+            {
+                "directory": str(dirs.dest),
+                "protocol": {"name": "local"},
+            },
+        ],
+    }
 
 
-local_destination_file_rename = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": "dest_rename.*taskhandler.*\\.txt",
-        "protocol": {"name": "local"},
-    },
-    "destination": [
-        {
-            "directory": f"{local_test_dir}/dest",
-            "rename": {
-                "pattern": "t(askha)ndler",
-                "sub": "T\\1NDLER",
-            },
+def local_destination_file_rename(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": "dest_rename.*taskhandler.*\\.txt",
             "protocol": {"name": "local"},
         },
-    ],
-}
-
-fail_invalid_protocol_task_definition = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": ".*taskhandler.*\\.txt",
-        "protocol": {"name": "nonexistent"},
-    },
-}
-
-local_multi_protocol_task_definition = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": ".*taskhandler.*\\.txt",
-        "protocol": {"name": "local"},
-    },
-    "destination": [
-        {
-            "hostname": "172.16.0.12",
-            "directory": "/tmp/testFiles/dest",
-            "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-        },
-        {
-            "hostname": "172.16.0.22",
-            "directory": "/home/application/testFiles/dest",
-            "protocol": {"name": "sftp", "credentials": {"username": "application"}},
+        "destination": [
+            {
+                "directory": str(dirs.dest),
+                "rename": {
+                    "pattern": "t(askha)ndler",
+                    "sub": "T\\1NDLER",
+                },
+                "protocol": {"name": "local"},
+            },
+        ],
+    }
+
+
+def fail_invalid_protocol_task_definition(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": ".*taskhandler.*\\.txt",
+            "protocol": {"name": "nonexistent"},
         },
-        {
-            "directory": f"{local_test_dir}/dest",
+    }
+
+
+def local_multi_protocol_task_definition(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": ".*taskhandler.*\\.txt",
             "protocol": {"name": "local"},
         },
-    ],
-}
+        "destination": [
+            {
+                "hostname": "172.16.0.12",
+                "directory": "/tmp/testFiles/dest",
+                "protocol": {"name": "ssh", "credentials": {"username": "application"}},
+            },
+            {
+                "hostname": "172.16.0.22",
+                "directory": "/home/application/testFiles/dest",
+                "protocol": {
+                    "name": "sftp",
+                    "credentials": {"username": "application"},
+                },
+            },
+            {
+                "directory": str(dirs.dest),
+                "protocol": {"name": "local"},
+            },
+        ],
+    }
+
 
 # Count conditional tests
-local_task_with_counts = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": "counts[0-9]\\.txt",
-        "conditionals": {
-            "count": {
-                "minCount": 2,
-                "maxCount": 2,
+def local_task_with_counts(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": "counts[0-9]\\.txt",
+            "conditionals": {
+                "count": {
+                    "minCount": 2,
+                    "maxCount": 2,
+                },
             },
-        },
-        "protocol": {"name": "local"},
-    },
-    "destination": [
-        {
-            "directory": f"{local_test_dir}/dest",
             "protocol": {"name": "local"},
         },
-    ],
-}
-
-local_file_watch_task_with_counts = {
-    "type": "transfer",
-    "source": {
-        "directory": f"{local_test_dir}/src",
-        "fileRegex": "counts_watch[0-9]\\.txt",
-        "fileWatch": {"timeout": 5},
-        "conditionals": {
-            "count": {
-                "minCount": 2,
-                "maxCount": 2,
+        "destination": [
+            {
+                "directory": str(dirs.dest),
+                "protocol": {"name": "local"},
+            },
+        ],
+    }
+
+
+def local_file_watch_task_with_counts(dirs):
+    return {
+        "type": "transfer",
+        "source": {
+            "directory": str(dirs.src),
+            "fileRegex": "counts_watch[0-9]\\.txt",
+            "fileWatch": {"timeout": 5},
+            "conditionals": {
+                "count": {
+                    "minCount": 2,
+                    "maxCount": 2,
+                },
+                "checkDuringFilewatch": True,
             },
-            "checkDuringFilewatch": True,
-        },
-        "protocol": {"name": "local"},
-    },
-    "destination": [
-        {
-            "directory": f"{local_test_dir}/dest",
             "protocol": {"name": "local"},
         },
-    ],
-}
+        "destination": [
+            {
+                "directory": str(dirs.dest),
+                "protocol": {"name": "local"},
+            },
+        ],
+    }
+
+
+# Every test uses the directories, so create them without each test asking. Each
+# session (and each xdist worker) gets its own directory, which pytest cleans up
+@pytest.fixture(scope="session", autouse=True)
+def setup_local_test_dir(tmp_path_factory):
+    root = tmp_path_factory.mktemp("local_tests")
+    dirs = SimpleNamespace(
+        root=root, src=root / "src", dest=root / "dest", archive=root / "archive"
+    )
+    for directory in (dirs.src, dirs.dest, dirs.archive):
+        directory.mkdir()
 
+    return dirs
 
+
+# Shared by every test, so it's never modified. Tests change a copy from
+# clone_task_definition, which also gives the source and destination specs that
+# Transfer writes to
 @pytest.fixture(scope="session")
-def setup_local_test_dir():
-    os.makedirs(f"{local_test_dir}/src", exist_ok=True)
-    os.makedirs(f"{local_test_dir}/dest", exist_ok=True)
-    os.makedirs(f"{local_test_dir}/archive", exist_ok=True)
+def local_task_definition(setup_local_test_dir):
+    return MappingProxyType(
+        {
+            "type": "transfer",
+            "source": {
+                "directory": str(setup_local_test_dir.src),
+                "fileRegex": ".*taskhandler.*\\.txt",
+                "protocol": {"name": "local"},
+            },
+            "destination": [
+                {
+                    "directory": str(setup_local_test_dir.dest),
+                    "protocol": {"name": "local"},
+                    "mode": "0644",
+                },
+            ],
+        }
+    )
+
 
-    return local_test_dir
+@pytest.fixture
+def unique_id(request) -> int:
+    # Stable for each test, so the same paths are used if a failure is rerun.
+    # hash() is salted per process, so use a checksum of the node ID instead
+    return zlib.crc32(request.node.nodeid.encode())
 
 
-def test_remote_handler():
+def test_remote_handler(local_task_definition):
     # Validate that given a transfer with local protocol, that we get a remote handler of type local
 
-    transfer_obj = transfer.Transfer(None, "sftp-basic", local_task_definition)
+    transfer_obj = transfer.Transfer(
+        None, "sftp-basic", clone_task_definition(local_task_definition)
+    )
 
     transfer_obj._set_remote_handlers()
 
@@ -330,9 +396,10 @@ def test_remote_handler():
     assert transfer_obj.dest_remote_handlers[0].__class__.__name__ == "LocalTransfer"
 
 
-def test_local_non_existent_file(setup_local_test_dir):
-    local_task_definition_copy = deepcopy(local_task_definition)
-    local_task_definition_copy["source"]["fileRegex"] = ".*nonexistent.*\\.txt"
+def test_local_non_existent_file(local_task_definition):
+    local_task_definition_copy = clone_task_definition(
+        local_task_definition, fileRegex=".*nonexistent.*\\.txt"
+    )
     # Create a transfer object
     transfer_obj = transfer.Transfer(
         None, "local-non-existent", local_task_definition_copy
@@ -343,28 +410,30 @@ def test_local_non_existent_file(setup_local_test_dir):
         transfer_obj.run()
 
 
-def test_local_basic(setup_local_test_dir):
+def test_local_basic(setup_local_test_dir, local_task_definition, unique_id):
     # Create a test file
-    fs.create_files(
-        [{f"{local_test_dir}/src/test.taskhandler.txt": {"content": "test1234"}}]
-    )
+    write_test_files({setup_local_test_dir.src / "test.taskhandler.txt": "test1234"})
 
     # Create a transfer object
-    transfer_obj = transfer.Transfer(None, "local-basic", local_task_definition)
+    transfer_obj = transfer.Transfer(
+        None, "local-basic", clone_task_definition(local_task_definition)
+    )
 
     # Run the transfer and expect a true status
     assert transfer_obj.run()
     # Check the destination file exists
-    assert os.path.exists(f"{local_test_dir}/dest/test.taskhandler.txt")
-
-    # Generate a random number
-    random_number = random.randint(1, 1000000)
-    # Test transferring to a subdir that doesn't exist, and creating it
-    local_task_definition["destination"][0][
-        "directory"
-    ] = f"/{local_test_dir}/dest/{random_number}"
+    assert os.path.exists(setup_local_test_dir.dest / "test.taskhandler.txt")
+
+    # Test transferring to a subdir that doesn't exist, and creating it. The name is
+    # the same on every run, so remove it if a previous run created it
+    random_number = unique_id
+    shutil.rmtree(setup_local_test_dir.dest / str(random_number), ignore_errors=True)
+    local_task_definition_copy = clone_task_definition(local_task_definition)
+    local_task_definition_copy["destination"][0]["directory"] = str(
+        setup_local_test_dir.dest / str(random_number)
+    )
 
-    transfer_obj = transfer.Transfer(None, "local-basic", local_task_definition)
+    transfer_obj = transfer.Transfer(None, "local-basic", local_task_definition_copy)
 
     # Run the transfer and expect a false status, as we've not asked the directory to be created
     # Expect a RemoteTransferError
@@ -372,32 +441,38 @@ def test_local_basic(setup_local_test_dir):
         transfer_obj.run()
 
     assert not os.path.exists(
-        f"{local_test_dir}/dest/{random_number}/test.taskhandler.txt"
+        setup_local_test_dir.dest / str(random_number) / "test.taskhandler.txt"
     )
 
     # Check file mode is 644
     assert (
-        oct(os.stat(f"{local_test_dir}/dest/test.taskhandler.txt").st_mode)[-3:]
-        == "644"
+        stat.S_IMODE(
+            os.stat(setup_local_test_dir.dest / "test.taskhandler.txt").st_mode
+        )
+        == 0o644
     )
 
     # Now run again, but ask for the dir to be created
 
-    local_task_definition["destination"][0]["createDirectoryIfNotExists"] = True
+    local_task_definition_copy["destination"][0]["createDirectoryIfNotExists"] = True
 
-    transfer_obj = transfer.Transfer(None, "local-basic", local_task_definition)
+    transfer_obj = transfer.Transfer(None, "local-basic", local_task_definition_copy)
 
     # Run the transfer and expect a true status
     assert transfer_obj.run()
 
     # Check the destination file exists
-    assert os.path.exists(f"{local_test_dir}/dest/{random_number}/test.taskhandler.txt")
+    assert os.path.exists(
+        setup_local_test_dir.dest / str(random_number) / "test.taskhandler.txt"
+    )
 
 
-def test_local_filewatch_no_error():
+def test_local_filewatch_no_error(setup_local_test_dir):
     # Create a transfer object
     transfer_obj = transfer.Transfer(
-        None, "local-no-file-no-error", local_file_watch_task_no_error_definition
+        None,
+        "local-no-file-no-error",
+        local_file_watch_task_no_error_definition(setup_local_test_dir),
     )
 
     # Run the transfer and expect a true status
@@ -406,212 +481,257 @@ def test_local_filewatch_no_error():
 
 def test_local_basic_write_fin(setup_local_test_dir):
     # Delete any fin files that exist
-    for file in os.listdir(f"{local_test_dir}/dest"):
-        if file.endswith(".fin"):
-            os.remove(f"{local_test_dir}/dest/{file}")
+    with os.scandir(setup_local_test_dir.dest) as entries:
+        for entry in entries:
+            if entry.name.endswith(".fin"):
+                os.remove(entry.path)
 
     # Create a test file
-    fs.create_files(
-        [{f"{local_test_dir}/src/test.taskhandler.fin.txt": {"content": "test1234"}}]
+    write_test_files(
+        {setup_local_test_dir.src / "test.taskhandler.fin.txt": "test1234"}
     )
 
     # Create a transfer object
     transfer_obj = transfer.Transfer(
-        None, "local-basic", local_with_fin_task_definition
+        None, "local-basic", local_with_fin_task_definition(setup_local_test_dir)
     )
 
     # Run the transfer and expect a true status
     assert transfer_obj.run()
     # Check the destination file exists
-    assert os.path.exists(f"{local_test_dir}/dest/test.taskhandler.fin.txt")
+    assert os.path.exists(setup_local_test_dir.dest / "test.taskhandler.fin.txt")
 
     # Check the fin file exists
-    assert os.path.exists(f"{local_test_dir}/dest/sftp_with_fin.fin")
+    assert os.path.exists(setup_local_test_dir.dest / "sftp_with_fin.fin")
 
 
-def test_pca_move(setup_local_test_dir):
-    # Empty the PCA archive directory
-    for file in os.listdir(f"{local_test_dir}/archive"):
-        os.remove(f"{local_test_dir}/archive/{file}")
-
-    # Create the test file
-    fs.create_files([{f"{local_test_dir}/src/pca_move.txt": {"content": "test1234"}}])
-    # Create a transfer object
-    transfer_obj = transfer.Transfer(
-        None, "local-pca-move", local_pca_move_task_definition_1
+def test_local_multiple_destinations(
+    setup_local_test_dir, local_task_definition, unique_id
+):
+    # Create a test file
+    write_test_files(
+        {setup_local_test_dir.src / "test.taskhandler.multi.txt": "test1234"}
     )
 
-    # Run the transfer and expect a true status
-    assert transfer_obj.run()
-    # Check the destination file exists
-    assert os.path.exists(f"{local_test_dir}/dest/pca_move.txt")
-    # Check the source file no longer exists
-    assert not os.path.exists(f"{local_test_dir}/src/pca_move.txt")
-
-    # Check the source file has been archived
-    assert os.path.exists(f"{local_test_dir}/archive/pca_move.txt")
+    local_task_definition_copy = clone_task_definition(
+        local_task_definition, fileRegex=".*taskhandler\\.multi\\.txt"
+    )
+    local_task_definition_copy["destination"] = [
+        {
+            "directory": str(setup_local_test_dir.dest / f"multi_{i}"),
+            "protocol": {"name": "local"},
+            "createDirectoryIfNotExists": True,
+        }
+        for i in range(3)
+    ]
 
-    # Create the next test file
-    fs.create_files([{f"{local_test_dir}/src/pca_move_2.txt": {"content": "test1234"}}])
+    # Run the transfer and expect every destination to receive the file
     transfer_obj = transfer.Transfer(
-        None, "local-pca-move-2", local_pca_move_task_definition_2
+        None, "local-multi-dest", local_task_definition_copy
     )
-
-    # Run the transfer and expect a true status
     assert transfer_obj.run()
+    for i in range(3):
+        assert os.path.exists(
+            setup_local_test_dir.dest / f"multi_{i}" / "test.taskhandler.multi.txt"
+        )
 
-    # Check the destination file exists
-    assert os.path.exists(f"{local_test_dir}/dest/pca_move_2.txt")
-    # Check the source file no longer exists
-    assert not os.path.exists(f"{local_test_dir}/src/pca_move_2.txt")
-
-    # Check the source file has been archived
-    assert os.path.exists(f"{local_test_dir}/archive/pca_move_2.txt")
-
-    fs.create_files([{f"{local_test_dir}/src/pca_move_3.txt": {"content": "test1234"}}])
+    # A failure on one destination should still fail the whole transfer
+    random_number = unique_id
+    local_task_definition_copy["destination"][1] = {
+        "directory": str(setup_local_test_dir.dest / str(random_number)),
+        "protocol": {"name": "local"},
+    }
     transfer_obj = transfer.Transfer(
-        None, "local-pca-move-invalid", local_pca_invalid_move_task_definition
+        None, "local-multi-dest", local_task_definition_copy
     )
-
-    # Run the transfer and expect a failure status
     with pytest.raises(exceptions.RemoteTransferError):
         transfer_obj.run()
-    # Check the destination file exists
-    assert os.path.exists(f"{local_test_dir}/dest/pca_move_3.txt")
-    # Check the source file should still exist
-    assert os.path.exists(f"{local_test_dir}/src/pca_move_3.txt")
 
-    # Check the source file has not been archived
-    assert not os.path.exists(f"{local_test_dir}/archive/pca_move_bad.txt")
 
-    # Finally, try moving to a directory that doesn't exist
-    fs.create_files([{f"{local_test_dir}/src/pca_move_4.txt": {"content": "test1234"}}])
+@pytest.mark.parametrize(
+    "task_id, task_definition, file_name, archived_name, valid",
+    [
+        (
+            "local-pca-move",
+            local_pca_move_task_definition_1,
+            "pca_move.txt",
+            "pca_move.txt",
+            True,
+        ),
+        # Trailing slash on the archive directory
+        (
+            "local-pca-move-2",
+            local_pca_move_task_definition_2,
+            "pca_move_2.txt",
+            "pca_move_2.txt",
+            True,
+        ),
+        # Archive destination is a file name, not a directory
+        (
+            "local-pca-move-invalid",
+            local_pca_invalid_move_task_definition,
+            "pca_move_3.txt",
+            "pca_move_bad.txt",
+            False,
+        ),
+        # Archive destination is a file that already exists (/etc/passwd), so
+        # nothing is archived
+        (
+            "local-pca-move-invalid-dir",
+            local_pca_invalid_move_dir_task_definition,
+            "pca_move_4.txt",
+            None,
+            False,
+        ),
+    ],
+    ids=["move", "move_trailing_slash", "invalid_move", "invalid_move_dir"],
+)
+def test_pca_move(
+    setup_local_test_dir, task_id, task_definition, file_name, archived_name, valid
+):
+    # Empty the PCA archive directory
+    empty_directory(setup_local_test_dir.archive)
+
+    # Create the test file
+    write_test_files({setup_local_test_dir.src / file_name: "test1234"})
+    # The invalid_move_dir case targets /etc/passwd, so check it's left untouched
+    passwd_before = Path("/etc/passwd").read_bytes()
+    # Create a transfer object
     transfer_obj = transfer.Transfer(
-        None, "local-pca-move-invalid", local_pca_invalid_move_dir_task_definition
+        None, task_id, task_definition(setup_local_test_dir)
     )
-    # Run the transfer and expect a failure status
-    with pytest.raises(exceptions.RemoteTransferError):
-        transfer_obj.run()
-    # Check the destination file exists
-    assert os.path.exists(f"{local_test_dir}/dest/pca_move_4.txt")
-    # Check the source file should still exist
-    assert os.path.exists(f"{local_test_dir}/src/pca_move_4.txt")
 
-    # Check the source file has not been archived
-    assert not os.path.exists(
-        f"{local_test_dir}/archive/archive_no-exist/pca_move_bad.txt"
-    )
+    if valid:
+        # Run the transfer and expect a true status
+        assert transfer_obj.run()
+    else:
+        # The transfer succeeds, but the post copy action fails
+        with pytest.raises(exceptions.RemoteTransferError):
+            transfer_obj.run()
+
+    # Check the destination file exists
+    assert os.path.exists(setup_local_test_dir.dest / file_name)
+    # Check the source file has been removed, unless the move failed
+    assert os.path.exists(setup_local_test_dir.src / file_name) != valid
+    if archived_name is not None:
+        # Check the source file has been archived, unless the move failed
+        assert os.path.exists(setup_local_test_dir.archive / archived_name) == valid
+    else:
+        # The file the move targeted must not have been replaced
+        assert Path("/etc/passwd").read_bytes() == passwd_before
 
 
 def test_pca_delete(setup_local_test_dir):
     # Create the test file
-    fs.create_files([{f"{local_test_dir}/src/pca_delete.txt": {"content": "test1234"}}])
+    write_test_files({setup_local_test_dir.src / "pca_delete.txt": "test1234"})
     # Create a transfer object
     transfer_obj = transfer.Transfer(
-        None, "local-pca-delete", local_pca_delete_task_definition_1
+        None,
+        "local-pca-delete",
+        local_pca_delete_task_definition_1(setup_local_test_dir),
     )
 
     # Run the transfer and expect a true status
     assert transfer_obj.run()
     # Check the destination file exists
-    assert os.path.exists(f"{local_test_dir}/dest/pca_delete.txt")
+    assert os.path.exists(setup_local_test_dir.dest / "pca_delete.txt")
     # Check the source file no longer exists
-    assert not os.path.exists(f"{local_test_dir}/src/pca_delete.txt")
+    assert not os.path.exists(setup_local_test_dir.src / "pca_delete.txt")
 
 
-def test_destination_file_rename(setup_local_test_dir):
-    # Random number
-    import random
-
-    random_no = random.randint(1, 1000)
+def test_destination_file_rename(setup_local_test_dir, unique_id):
+    random_no = unique_id
 
     # Create the test file
-    fs.create_files(
-        [
-            {
-                f"{local_test_dir}/src/dest_rename_{random_no}_taskhandler.txt": {
-                    "content": "test1234"
-                }
-            }
-        ]
+    write_test_files(
+        {
+            setup_local_test_dir.src
+            / f"dest_rename_{random_no}_taskhandler.txt": "test1234"
+        }
     )
     # Create a transfer object
     transfer_obj = transfer.Transfer(
-        None, "local-dest-rename", local_destination_file_rename
+        None, "local-dest-rename", local_destination_file_rename(setup_local_test_dir)
     )
 
     # Run the transfer and expect a true status
     assert transfer_obj.run()
     # Check the destination file exists
     assert os.path.exists(
-        f"{local_test_dir}/dest/dest_rename_{random_no}_TaskhaNDLER.txt"
+        setup_local_test_dir.dest / f"dest_rename_{random_no}_TaskhaNDLER.txt"
     )
 
 
 def test_pca_rename(setup_local_test_dir):
     # Empty the PCA archive directory
-    for file in os.listdir(f"{local_test_dir}/archive"):
-        os.remove(f"{local_test_dir}/archive/{file}")
+    empty_directory(setup_local_test_dir.archive)
 
     # Create the test file
-    fs.create_files(
-        [{f"{local_test_dir}/src/pca_rename_1.txt": {"content": "test1234"}}]
-    )
+    write_test_files({setup_local_test_dir.src / "pca_rename_1.txt": "test1234"})
     # Create a transfer object
     transfer_obj = transfer.Transfer(
-        None, "local-pca-rename", local_pca_rename_task_definition_1
+        None,
+        "local-pca-rename",
+        local_pca_rename_task_definition_1(setup_local_test_dir),
     )
 
     # Run the transfer and expect a true status
     assert transfer_obj.run()
     # Check the destination file exists
-    assert os.path.exists(f"{local_test_dir}/dest/pca_rename_1.txt")
+    assert os.path.exists(setup_local_test_dir.dest / "pca_rename_1.txt")
     # Check the source file no longer exists
-    assert not os.path.exists(f"{local_test_dir}/src/pca_rename_1.txt")
+    assert not os.path.exists(setup_local_test_dir.src / "pca_rename_1.txt")
 
     # Check the source file has been archived
-    assert os.path.exists(f"{local_test_dir}/archive/pca_renamed_1.txt")
+    assert os.path.exists(setup_local_test_dir.archive / "pca_renamed_1.txt")
 
 
 def test_pca_rename_many(setup_local_test_dir):
     # Create the test file
     # Empty the PCA archive directory
-    for file in os.listdir(f"{local_test_dir}/archive"):
-        os.remove(f"{local_test_dir}/archive/{file}")
+    empty_directory(setup_local_test_dir.archive)
 
     # for 1 to 10
-    for i in range(1, 10):
-        fs.create_files(
-            [{f"{local_test_dir}/src/pca_rename_many_{i}.txt": {"content": "test1234"}}]
-        )
+    write_test_files(
+        {
+            setup_local_test_dir.src / f"pca_rename_many_{i}.txt": "test1234"
+            for i in range(1, 10)
+        }
+    )
     # Create a transfer object
     transfer_obj = transfer.Transfer(
-        None, "local-pca-rename-name", local_pca_rename_many_task_definition_1
+        None,
+        "local-pca-rename-name",
+        local_pca_rename_many_task_definition_1(setup_local_test_dir),
     )
 
     # Run the transfer and expect a true status
     assert transfer_obj.run()
-    # Check the destination file exists
+    # List each directory once, rather than checking every file individually
+    dest_files = list_directory(setup_local_test_dir.dest)
+    src_files = list_directory(setup_local_test_dir.src)
+    archive_files = list_directory(setup_local_test_dir.archive)
     for i in range(1, 10):
-        assert os.path.exists(f"{local_test_dir}/dest/pca_rename_many_{i}.txt")
+        # Check the destination file exists
+        assert f"pca_rename_many_{i}.txt" in dest_files
         # Check the source file no longer exists
-        assert not os.path.exists(f"{local_test_dir}/src/pca_rename_many_{i}.txt")
-
+        assert f"pca_rename_many_{i}.txt" not in src_files
         # Check the source file has been archived
-        assert os.path.exists(f"{local_test_dir}/archive/pca_renamed_many_{i}.txt")
+        assert f"pca_renamed_many_{i}.txt" in archive_files
 
 
+@pytest.mark.slow
 def test_local_multi_protocol(
-    root_dir, setup_local_test_dir, setup_ssh_keys, setup_sftp_keys
+    setup_local_test_dir, root_dir, setup_ssh_keys, setup_sftp_keys
 ):
     # Create a test file
-    fs.create_files(
-        [{f"{local_test_dir}/src/test.taskhandler.txt": {"content": "test1234"}}]
-    )
+    write_test_files({setup_local_test_dir.src / "test.taskhandler.txt": "test1234"})
 
     # Create a transfer object
     transfer_obj = transfer.Transfer(
-        None, "local-multi-protocol", local_multi_protocol_task_definition
+        None,
+        "local-multi-protocol",
+        local_multi_protocol_task_definition(setup_local_test_dir),
     )
 
     # Run the transfer and expect a true status
@@ -619,57 +739,38 @@ def test_local_multi_protocol(
     # Check the destination file exists
     assert os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/test.taskhandler.txt")
     assert os.path.exists(f"{root_dir}/testFiles/sftp_2/dest/test.taskhandler.txt")
-    assert os.path.exists(f"{local_test_dir}/dest/test.taskhandler.txt")
+    assert os.path.exists(setup_local_test_dir.dest / "test.taskhandler.txt")
 
 
+@requires_gpg
 def test_local_decrypt_incoming_file(
-    tmpdir, root_dir, setup_local_test_dir, private_key, public_key
+    setup_local_test_dir,
+    local_task_definition,
+    tmp_path,
+    root_dir,
+    private_key,
+    encrypted_test_file,
 ):
-
-    # Create a test file
-    fs.create_files(
-        [{f"{tmpdir}/src/test.decryption.txt": {"content": "test12345678"}}]
-    )
-
-    # Checksum the file
-    with open(f"{tmpdir}/src/test.decryption.txt", "rb") as f:
-        original_file_checksum = hashlib.md5(f.read()).hexdigest()
-
-    # Create a gpg object
-    gpg = gnupg.GPG(gnupghome=f"{tmpdir}")
-
-    # Import the public key
-    gpg.import_keys(public_key)
-
-    # Encrypt the file
-    with open(f"{tmpdir}/src/test.decryption.txt", "rb") as f:
-        status = gpg.encrypt_file(
-            f,
-            always_trust=True,
-            recipients="test@example.com",
-            output=f"{tmpdir}/test.decryption.txt.gpg",
-        )
-
-        # Check status returns a 0 exit code
-        assert status.ok
-
-    # Check the output file exists
-    assert os.path.exists(f"{tmpdir}/test.decryption.txt.gpg")
+    # Copy in the file that was encrypted for the session
+    plaintext, ciphertext = encrypted_test_file
+    shutil.copy(ciphertext, tmp_path / "test.decryption.txt.gpg")
 
     # Now we have an encrypted file (we can pretend we are collecting from elsewhere),
     # run a transfer to copy the file locally, and decrypt it
-    local_task_definition_copy = deepcopy(local_task_definition)
-    local_task_definition_copy["source"]["directory"] = f"{tmpdir}"
-    local_task_definition_copy["source"]["fileRegex"] = "test.decryption.txt.gpg"
-    local_task_definition_copy["source"]["encryption"] = {
-        "decrypt": True,
-        "private_key": private_key,
-    }
+    local_task_definition_copy = clone_task_definition(
+        local_task_definition,
+        directory=str(tmp_path),
+        fileRegex="test.decryption.txt.gpg",
+        encryption={
+            "decrypt": True,
+            "private_key": private_key,
+        },
+    )
 
     # Override the destination
     local_task_definition_copy["destination"] = [
         {
-            "directory": f"{local_test_dir}/dest",
+            "directory": str(setup_local_test_dir.dest),
             "protocol": {"name": "local"},
         },
     ]
@@ -679,65 +780,47 @@ def test_local_decrypt_incoming_file(
     assert transfer_obj.run()
 
     # Check the decrypted source files have been deleted
-    assert not os.path.exists(f"{tmpdir}/test.decryption.txt")
+    assert not os.path.exists(tmp_path / "test.decryption.txt")
 
     # Check the output file exists
-    assert os.path.exists(f"{local_test_dir}/dest/test.decryption.txt")
-    # Check that the file's checksum matches that of the original unencrypted source file
-    # Check the checksum of the new file
-    with open(f"{local_test_dir}/dest/test.decryption.txt", "rb") as f:
-        new_file_checksum = hashlib.md5(f.read()).hexdigest()
-    assert new_file_checksum == original_file_checksum
+    assert os.path.exists(setup_local_test_dir.dest / "test.decryption.txt")
+    # Check that the file matches the original unencrypted source file
+    assert filecmp.cmp(
+        plaintext,
+        setup_local_test_dir.dest / "test.decryption.txt",
+        shallow=False,
+    )
 
 
+@requires_gpg
 def test_local_decrypt_incoming_file_custom_extensions(
-    tmpdir, root_dir, setup_local_test_dir, private_key, public_key
+    setup_local_test_dir,
+    local_task_definition,
+    tmp_path,
+    root_dir,
+    private_key,
+    encrypted_test_file,
 ):
-
-    # Create a test file
-    fs.create_files(
-        [{f"{tmpdir}/src/test.decryption.txt": {"content": "test12345678"}}]
-    )
-
-    # Checksum the file
-    with open(f"{tmpdir}/src/test.decryption.txt", "rb") as f:
-        original_file_checksum = hashlib.md5(f.read()).hexdigest()
-
-    # Create a gpg object
-    gpg = gnupg.GPG(gnupghome=f"{tmpdir}")
-
-    # Import the public key
-    gpg.import_keys(public_key)
-
-    # Encrypt the file
-    with open(f"{tmpdir}/src/test.decryption.txt", "rb") as f:
-        status = gpg.encrypt_file(
-            f,
-            always_trust=True,
-            recipients="test@example.com",
-            output=f"{tmpdir}/test.decryption.txt.pgp",
-        )
-
-        # Check status returns a 0 exit code
-        assert status.ok
-
-    # Check the output file exists
-    assert os.path.exists(f"{tmpdir}/test.decryption.txt.pgp")
+    # Copy in the file that was encrypted for the session
+    plaintext, ciphertext = encrypted_test_file
+    shutil.copy(ciphertext, tmp_path / "test.decryption.txt.pgp")
 
     # Now we have an encrypted file (we can pretend we are collecting from elsewhere),
     # run a transfer to copy the file locally, and decrypt it
-    local_task_definition_copy = deepcopy(local_task_definition)
-    local_task_definition_copy["source"]["directory"] = f"{tmpdir}"
-    local_task_definition_copy["source"]["fileRegex"] = "test.decryption.txt.pgp"
-    local_task_definition_copy["source"]["encryption"] = {
-        "decrypt": True,
-        "private_key": private_key,
-    }
+    local_task_definition_copy = clone_task_definition(
+        local_task_definition,
+        directory=str(tmp_path),
+        fileRegex="test.decryption.txt.pgp",
+        encryption={
+            "decrypt": True,
+            "private_key": private_key,
+        },
+    )
 
     # Override the destination
     local_task_definition_copy["destination"] = [
         {
-            "directory": f"{local_test_dir}/dest",
+            "directory": str(setup_local_test_dir.dest),
             "protocol": {"name": "local"},
         },
     ]
@@ -747,19 +830,22 @@ def test_local_decrypt_incoming_file_custom_extensions(
     assert transfer_obj.run()
 
     # Check the decrypted source files have been deleted
-    assert not os.path.exists(f"{tmpdir}/test.decryption.txt")
+    assert not os.path.exists(tmp_path / "test.decryption.txt")
 
     # Check the output file exists
-    assert os.path.exists(f"{local_test_dir}/dest/test.decryption.txt")
-    # Check that the file's checksum matches that of the original unencrypted source file
-    # Check the checksum of the new file
-    with open(f"{local_test_dir}/dest/test.decryption.txt", "rb") as f:
-        new_file_checksum = hashlib.md5(f.read()).hexdigest()
-    assert new_file_checksum == original_file_checksum
+    assert os.path.exists(setup_local_test_dir.dest / "test.decryption.txt")
+    # Check that the file matches the original unencrypted source file
+    assert filecmp.cmp(
+        plaintext,
+        setup_local_test_dir.dest / "test.decryption.txt",
+        shallow=False,
+    )
 
     # Now do it again, but with a different extension that's not pgp or gpg
     # Rename the original encrypted file and use that as the input
-    os.rename(f"{tmpdir}/test.decryption.txt.pgp", f"{tmpdir}/test.decryption.txt.enc")
+    os.rename(
+        tmp_path / "test.decryption.txt.pgp", tmp_path / "test.decryption.txt.enc"
+    )
     local_task_definition_copy["source"]["fileRegex"] = "test.decryption.txt.enc"
 
     # Run the transfer
@@ -767,40 +853,35 @@ def test_local_decrypt_incoming_file_custom_extensions(
     assert transfer_obj.run()
 
     # Check the decrypted source files have been deleted
-    assert not os.path.exists(f"{tmpdir}/test.decryption.txt")
+    assert not os.path.exists(tmp_path / "test.decryption.txt")
 
     # Check the output file exists with the .decrypted file extension
-    assert os.path.exists(f"{local_test_dir}/dest/test.decryption.txt.enc.decrypted")
+    assert os.path.exists(
+        setup_local_test_dir.dest / "test.decryption.txt.enc.decrypted"
+    )
 
 
+@requires_gpg
 def test_local_encrypt_outgoing_file(
-    tmpdir, root_dir, setup_local_test_dir, private_key, public_key
+    setup_local_test_dir, local_task_definition, tmp_path, root_dir, public_key, gpg_env
 ):
 
     # Create a test file
-    fs.create_files(
-        [{f"{tmpdir}/src/test.encryption.txt": {"content": "test12345678"}}]
-    )
-
-    # Checksum the file
-    with open(f"{tmpdir}/src/test.encryption.txt", "rb") as f:
-        original_file_checksum = hashlib.md5(f.read()).hexdigest()
-
-    # Create a gpg object
-    gpg = gnupg.GPG(gnupghome=f"{tmpdir}")
+    write_test_files({tmp_path / "src" / "test.encryption.txt": "test12345678"})
 
-    # Import the public key
-    gpg.import_keys(private_key)
+    gpg, _ = gpg_env
 
     # run a transfer to copy the file locally, and encrypt it
-    local_task_definition_copy = deepcopy(local_task_definition)
-    local_task_definition_copy["source"]["directory"] = f"{tmpdir}/src"
-    local_task_definition_copy["source"]["fileRegex"] = "test.encryption.txt"
+    local_task_definition_copy = clone_task_definition(
+        local_task_definition,
+        directory=str(tmp_path / "src"),
+        fileRegex="test.encryption.txt",
+    )
 
     # Override the destination
     local_task_definition_copy["destination"] = [
         {
-            "directory": f"{local_test_dir}/dest",
+            "directory": str(setup_local_test_dir.dest),
             "protocol": {"name": "local"},
             "encryption": {
                 "encrypt": True,
@@ -814,56 +895,110 @@ def test_local_encrypt_outgoing_file(
     assert transfer_obj.run()
 
     # Check the output file exists
-    assert os.path.exists(f"{local_test_dir}/dest/test.encryption.txt.gpg")
+    assert os.path.exists(setup_local_test_dir.dest / "test.encryption.txt.gpg")
 
     # Now we need to decrypt this file to check that it matches the original content,
     # and can actually be decrypted again
     decryption_data = gpg.decrypt_file(
-        open(f"{local_test_dir}/dest/test.encryption.txt.gpg", "rb"),
-        output=f"{local_test_dir}/dest/test.encryption.txt",
+        open(setup_local_test_dir.dest / "test.encryption.txt.gpg", "rb"),
+        output=str(setup_local_test_dir.dest / "test.encryption.txt"),
     )
 
     assert decryption_data.ok
     assert decryption_data.returncode == 0
 
-    # Check that the file's checksum matches that of the original unencrypted source file
-    # Check the checksum of the new file
-    with open(f"{local_test_dir}/dest/test.encryption.txt", "rb") as f:
-        new_file_checksum = hashlib.md5(f.read()).hexdigest()
-    assert new_file_checksum == original_file_checksum
+    # Check that the file matches the original unencrypted source file
+    assert filecmp.cmp(
+        tmp_path / "src" / "test.encryption.txt",
+        setup_local_test_dir.dest / "test.encryption.txt",
+        shallow=False,
+    )
 
-    # Ensure that the source encrypted file has been deleted
-    assert not os.path.exists(f"{local_test_dir}/src/test.encryption.txt.gpg")
+    # Ensure that the encrypted copy next to the source file has been deleted
+    assert not glob.glob(str(tmp_path / "src" / "*.gpg"))
 
 
-def test_local_encrypt_outgoing_file_custom_extension(
-    tmpdir, root_dir, setup_local_test_dir, private_key, public_key
+@requires_gpg
+def test_local_encrypt_one_of_multiple_destinations(
+    local_task_definition, tmp_path, public_key, gpg_env
 ):
-
     # Create a test file
-    fs.create_files(
-        [{f"{tmpdir}/src/test.encryption_custom_ext.txt": {"content": "test12345678"}}]
+    write_test_files({tmp_path / "src" / "test.encryption.multi.txt": "test12345678"})
+
+    gpg, _ = gpg_env
+
+    local_task_definition_copy = clone_task_definition(
+        local_task_definition,
+        directory=str(tmp_path / "src"),
+        fileRegex="test\\.encryption\\.multi\\.txt",
     )
 
-    # Checksum the file
-    with open(f"{tmpdir}/src/test.encryption_custom_ext.txt", "rb") as f:
-        original_file_checksum = hashlib.md5(f.read()).hexdigest()
+    # Encrypt for the first destination only
+    local_task_definition_copy["destination"] = [
+        {
+            "directory": str(tmp_path / "encrypted"),
+            "protocol": {"name": "local"},
+            "createDirectoryIfNotExists": True,
+            "encryption": {
+                "encrypt": True,
+                "public_key": public_key,
+            },
+        },
+        {
+            "directory": str(tmp_path / "plain"),
+            "protocol": {"name": "local"},
+            "createDirectoryIfNotExists": True,
+        },
+    ]
 
-    # Create a gpg object
-    gpg = gnupg.GPG(gnupghome=f"{tmpdir}")
+    transfer_obj = transfer.Transfer(
+        None, "local-encrypt-multi-dest", local_task_definition_copy
+    )
+    assert transfer_obj.run()
+
+    # Each destination should only get its own copy of the file
+    assert list_directory(tmp_path / "encrypted") == {"test.encryption.multi.txt.gpg"}
+    assert list_directory(tmp_path / "plain") == {"test.encryption.multi.txt"}
 
-    # Import the public key
-    gpg.import_keys(private_key)
+    assert filecmp.cmp(
+        tmp_path / "src" / "test.encryption.multi.txt",
+        tmp_path / "plain" / "test.encryption.multi.txt",
+        shallow=False,
+    )
+
+    decryption_data = gpg.decrypt_file(
+        open(tmp_path / "encrypted" / "test.encryption.multi.txt.gpg", "rb"),
+        output=str(tmp_path / "test.encryption.multi.txt"),
+    )
+    assert decryption_data.ok
+
+    # Ensure that the encrypted copy next to the source file has been deleted
+    assert not glob.glob(str(tmp_path / "src" / "*.gpg"))
+
+
+@requires_gpg
+def test_local_encrypt_outgoing_file_custom_extension(
+    setup_local_test_dir, local_task_definition, tmp_path, root_dir, public_key, gpg_env
+):
+
+    # Create a test file
+    write_test_files(
+        {tmp_path / "src" / "test.encryption_custom_ext.txt": "test12345678"}
+    )
+
+    gpg, _ = gpg_env
 
     # run a transfer to copy the file locally, and encrypt it
-    local_task_definition_copy = deepcopy(local_task_definition)
-    local_task_definition_copy["source"]["directory"] = f"{tmpdir}/src"
-    local_task_definition_copy["source"]["fileRegex"] = "test.encryption_custom_ext.txt"
+    local_task_definition_copy = clone_task_definition(
+        local_task_definition,
+        directory=str(tmp_path / "src"),
+        fileRegex="test.encryption_custom_ext.txt",
+    )
 
     # Override the destination
     local_task_definition_copy["destination"] = [
         {
-            "directory": f"{local_test_dir}/dest",
+            "directory": str(setup_local_test_dir.dest),
             "protocol": {"name": "local"},
             "encryption": {
                 "encrypt": True,
@@ -878,58 +1013,58 @@ def test_local_encrypt_outgoing_file_custom_extension(
     assert transfer_obj.run()
 
     # Check the output file exists
-    assert os.path.exists(f"{local_test_dir}/dest/test.encryption_custom_ext.txt.pgp")
+    assert os.path.exists(
+        setup_local_test_dir.dest / "test.encryption_custom_ext.txt.pgp"
+    )
 
     # Now we need to decrypt this file to check that it matches the original content,
     # and can actually be decrypted again
     decryption_data = gpg.decrypt_file(
-        open(f"{local_test_dir}/dest/test.encryption_custom_ext.txt.pgp", "rb"),
-        output=f"{local_test_dir}/dest/test.encryption_custom_ext.txt",
+        open(setup_local_test_dir.dest / "test.encryption_custom_ext.txt.pgp", "rb"),
+        output=str(setup_local_test_dir.dest / "test.encryption_custom_ext.txt"),
     )
 
     assert decryption_data.ok
     assert decryption_data.returncode == 0
 
-    # Check that the file's checksum matches that of the original unencrypted source file
-    # Check the checksum of the new file
-    with open(f"{local_test_dir}/dest/test.encryption_custom_ext.txt", "rb") as f:
-        new_file_checksum = hashlib.md5(f.read()).hexdigest()
-    assert new_file_checksum == original_file_checksum
-
-    # Ensure that the source encrypted file has been deleted
-    assert not os.path.exists(
-        f"{local_test_dir}/src/test.encryption_custom_ext.txt.pgp"
+    # Check that the file matches the original unencrypted source file
+    assert filecmp.cmp(
+        tmp_path / "src" / "test.encryption_custom_ext.txt",
+        setup_local_test_dir.dest / "test.encryption_custom_ext.txt",
+        shallow=False,
     )
 
+    # Ensure that the encrypted copy next to the source file has been deleted
+    assert not glob.glob(str(tmp_path / "src" / "*.pgp"))
+
 
+@requires_gpg
 def test_local_encrypt_with_signing_outgoing_file(
-    tmpdir, root_dir, setup_local_test_dir, private_key, public_key
+    setup_local_test_dir,
+    local_task_definition,
+    tmp_path,
+    root_dir,
+    private_key,
+    public_key,
+    gpg_env,
 ):
 
     # Create a test file
-    fs.create_files(
-        [{f"{tmpdir}/src/test.encryptionSign.txt": {"content": "test12345678"}}]
-    )
-
-    # Checksum the file
-    with open(f"{tmpdir}/src/test.encryptionSign.txt", "rb") as f:
-        original_file_checksum = hashlib.md5(f.read()).hexdigest()
-
-    # Create a gpg object
-    gpg = gnupg.GPG(gnupghome=f"{tmpdir}")
+    write_test_files({tmp_path / "src" / "test.encryptionSign.txt": "test12345678"})
 
-    # Import the private key
-    import_result = gpg.import_keys(private_key)
+    gpg, _ = gpg_env
 
     # run a transfer to copy the file locally, and encrypt it
-    local_task_definition_copy = deepcopy(local_task_definition)
-    local_task_definition_copy["source"]["directory"] = f"{tmpdir}/src"
-    local_task_definition_copy["source"]["fileRegex"] = "test.encryptionSign.txt"
+    local_task_definition_copy = clone_task_definition(
+        local_task_definition,
+        directory=str(tmp_path / "src"),
+        fileRegex="test.encryptionSign.txt",
+    )
 
     # Override the destination
     local_task_definition_copy["destination"] = [
         {
-            "directory": f"{local_test_dir}/dest",
+            "directory": str(setup_local_test_dir.dest),
             "protocol": {"name": "local"},
             "encryption": {
                 "encrypt": True,
@@ -947,13 +1082,13 @@ def test_local_encrypt_with_signing_outgoing_file(
     assert transfer_obj.run()
 
     # Check the output file exists
-    assert os.path.exists(f"{local_test_dir}/dest/test.encryptionSign.txt.gpg")
+    assert os.path.exists(setup_local_test_dir.dest / "test.encryptionSign.txt.gpg")
 
     # Now we need to decrypt this file to check that it matches the original content,
     # and can actually be decrypted again
     decryption_data = gpg.decrypt_file(
-        open(f"{local_test_dir}/dest/test.encryptionSign.txt.gpg", "rb"),
-        output=f"{local_test_dir}/dest/test.encryptionSign.txt",
+        open(setup_local_test_dir.dest / "test.encryptionSign.txt.gpg", "rb"),
+        output=str(setup_local_test_dir.dest / "test.encryptionSign.txt"),
     )
 
     assert decryption_data.ok
@@ -965,20 +1100,23 @@ def test_local_encrypt_with_signing_outgoing_file(
     for sig in decryption_data.sig_info:
         assert decryption_data.sig_info[sig]["status"] == "signature valid"
 
-    # Check that the file's checksum matches that of the original unencrypted source file
-    # Check the checksum of the new file
-    with open(f"{local_test_dir}/dest/test.encryptionSign.txt", "rb") as f:
-        new_file_checksum = hashlib.md5(f.read()).hexdigest()
-    assert new_file_checksum == original_file_checksum
+    # Check that the file matches the original unencrypted source file
+    assert filecmp.cmp(
+        tmp_path / "src" / "test.encryptionSign.txt",
+        setup_local_test_dir.dest / "test.encryptionSign.txt",
+        shallow=False,
+    )
 
-    # Ensure that the source encrypted file has been deleted
-    assert not os.path.exists(f"{local_test_dir}/src/test.encryptionSign.txt.gpg")
+    # Ensure that the encrypted copy next to the source file has been deleted
+    assert not glob.glob(str(tmp_path / "src" / "*.gpg"))
 
 
+@requires_gpg
 def test_local_encrypt_with_signing_missing_key_outgoing_file(
-    tmpdir,
-    root_dir,
     setup_local_test_dir,
+    local_task_definition,
+    tmp_path,
+    root_dir,
     private_key,
     public_key_2,
     private_key_2,
@@ -986,29 +1124,25 @@ def test_local_encrypt_with_signing_missing_key_outgoing_file(
 ):
 
     # Create a test file
-    fs.create_files(
-        [{f"{tmpdir}/src/test.encryptionSign2.txt": {"content": "test12345678"}}]
-    )
-
-    # Checksum the file
-    with open(f"{tmpdir}/src/test.encryptionSign2.txt", "rb") as f:
-        original_file_checksum = hashlib.md5(f.read()).hexdigest()
+    write_test_files({tmp_path / "src" / "test.encryptionSign2.txt": "test12345678"})
 
     # Create a gpg object
-    gpg = gnupg.GPG(gnupghome=f"{tmpdir}")
+    gpg = gnupg.GPG(gnupghome=str(tmp_path))
 
     # Import the second private key
     import_result = gpg.import_keys(private_key_2)
 
     # run a transfer to copy the file locally, and encrypt it
-    local_task_definition_copy = deepcopy(local_task_definition)
-    local_task_definition_copy["source"]["directory"] = f"{tmpdir}/src"
-    local_task_definition_copy["source"]["fileRegex"] = "test.encryptionSign2.txt"
+    local_task_definition_copy = clone_task_definition(
+        local_task_definition,
+        directory=str(tmp_path / "src"),
+        fileRegex="test.encryptionSign2.txt",
+    )
 
     # Override the destination
     local_task_definition_copy["destination"] = [
         {
-            "directory": f"{local_test_dir}/dest",
+            "directory": str(setup_local_test_dir.dest),
             "protocol": {"name": "local"},
             "encryption": {
                 "encrypt": True,
@@ -1026,13 +1160,13 @@ def test_local_encrypt_with_signing_missing_key_outgoing_file(
     assert transfer_obj.run()
 
     # Check the output file exists
-    assert os.path.exists(f"{local_test_dir}/dest/test.encryptionSign2.txt.gpg")
+    assert os.path.exists(setup_local_test_dir.dest / "test.encryptionSign2.txt.gpg")
 
     # Now we need to decrypt this file to check that it matches the original content,
     # and can actually be decrypted again
     decryption_data = gpg.decrypt_file(
-        open(f"{local_test_dir}/dest/test.encryptionSign2.txt.gpg", "rb"),
-        output=f"{local_test_dir}/dest/test.encryptionSign2.txt",
+        open(setup_local_test_dir.dest / "test.encryptionSign2.txt.gpg", "rb"),
+        output=str(setup_local_test_dir.dest / "test.encryptionSign2.txt"),
     )
 
     # Check that there was a problem and the stratus is signature error
@@ -1046,49 +1180,35 @@ def test_local_encrypt_with_signing_missing_key_outgoing_file(
     assert decryption_data.returncode != 0
 
 
+@requires_gpg
 def test_transfer_decryption_failure_local(
-    tmpdir, root_dir, setup_local_test_dir, private_key_2, public_key
+    setup_local_test_dir,
+    local_task_definition,
+    tmp_path,
+    root_dir,
+    private_key_2,
+    encrypted_test_file,
 ):
-
-    # Create a file and encrypt it with public key
-    fs.create_files(
-        [{f"{tmpdir}/src/test.decryption.txt": {"content": "test12345678"}}]
-    )
-    # Create a gpg object
-    gpg = gnupg.GPG(gnupghome=f"{tmpdir}")
-
-    # Import the public key
-    gpg.import_keys(public_key)
-
-    # Encrypt the file
-    with open(f"{tmpdir}/src/test.decryption.txt", "rb") as f:
-        status = gpg.encrypt_file(
-            f,
-            always_trust=True,
-            recipients="test@example.com",
-            output=f"{tmpdir}/test.decryption.txt.gpg",
-        )
-
-        # Check status returns a 0 exit code
-        assert status.ok
-
-    # Check the output file exists
-    assert os.path.exists(f"{tmpdir}/test.decryption.txt.gpg")
+    # Copy in the file that was encrypted with the first public key for the session
+    _, ciphertext = encrypted_test_file
+    shutil.copy(ciphertext, tmp_path / "test.decryption.txt.gpg")
 
     # Now we have an encrypted file (we can pretend we are collecting from elsewhere),
     # run a transfer to copy the file locally, and decrypt it
-    local_task_definition_copy = deepcopy(local_task_definition)
-    local_task_definition_copy["source"]["directory"] = f"{tmpdir}"
-    local_task_definition_copy["source"]["fileRegex"] = "test.decryption.txt.gpg"
-    local_task_definition_copy["source"]["encryption"] = {
-        "decrypt": True,
-        "private_key": private_key_2,
-    }
+    local_task_definition_copy = clone_task_definition(
+        local_task_definition,
+        directory=str(tmp_path),
+        fileRegex="test.decryption.txt.gpg",
+        encryption={
+            "decrypt": True,
+            "private_key": private_key_2,
+        },
+    )
 
     # Override the destination
     local_task_definition_copy["destination"] = [
         {
-            "directory": f"{local_test_dir}/dest",
+            "directory": str(setup_local_test_dir.dest),
             "protocol": {"name": "local"},
         },
     ]
@@ -1100,20 +1220,23 @@ def test_transfer_decryption_failure_local(
         transfer_obj.run()
 
 
-def test_transfer_encryption_local_invalid_key(root_dir, setup_local_test_dir):
+@requires_gpg
+def test_transfer_encryption_local_invalid_key(
+    setup_local_test_dir, local_task_definition, root_dir
+):
     # Create a test file
-    fs.create_files(
-        [{f"{local_test_dir}/src/test.encryption.txt": {"content": "test12345678"}}]
-    )
+    write_test_files({setup_local_test_dir.src / "test.encryption.txt": "test12345678"})
 
-    local_task_definition_copy = deepcopy(local_task_definition)
-    local_task_definition_copy["source"]["directory"] = f"{local_test_dir}/src"
-    local_task_definition_copy["source"]["fileRegex"] = "test.encryption.txt"
+    local_task_definition_copy = clone_task_definition(
+        local_task_definition,
+        directory=str(setup_local_test_dir.src),
+        fileRegex="test.encryption.txt",
+    )
 
     # Override the destination
     local_task_definition_copy["destination"] = [
         {
-            "directory": f"{local_test_dir}/dest",
+            "directory": str(setup_local_test_dir.dest),
             "protocol": {"name": "local"},
             "encryption": {
                 "encrypt": True,
@@ -1130,20 +1253,23 @@ def test_transfer_encryption_local_invalid_key(root_dir, setup_local_test_dir):
         transfer_obj.run()
 
 
-def test_transfer_decryption_local_invalid_key(root_dir, setup_local_test_dir):
+@requires_gpg
+def test_transfer_decryption_local_invalid_key(
+    setup_local_test_dir, local_task_definition, root_dir
+):
     # Create a test file
-    fs.create_files(
-        [{f"{local_test_dir}/src/test.encryption.txt": {"content": "test12345678"}}]
+    write_test_files({setup_local_test_dir.src / "test.encryption.txt": "test12345678"})
+
+    local_task_definition_copy = clone_task_definition(
+        local_task_definition,
+        directory=str(setup_local_test_dir.src),
+        fileRegex="test.encryption.txt",
+        encryption={
+            "decrypt": True,
+            "private_key": "invalid_private_key",
+        },
     )
 
-    local_task_definition_copy = deepcopy(local_task_definition)
-    local_task_definition_copy["source"]["directory"] = f"{local_test_dir}/src"
-    local_task_definition_copy["source"]["fileRegex"] = "test.encryption.txt"
-    local_task_definition_copy["source"]["encryption"] = {
-        "decrypt": True,
-        "private_key": "invalid_private_key",
-    }
-
     # Create a transfer object
     transfer_obj = transfer.Transfer(None, "local-decrypt", local_task_definition_copy)
 
@@ -1152,31 +1278,31 @@ def test_transfer_decryption_local_invalid_key(root_dir, setup_local_test_dir):
         transfer_obj.run()
 
 
-def test_local_counts():
+def test_local_counts(setup_local_test_dir):
     # Create a test file
-    fs.create_files(
-        [
-            {f"{local_test_dir}/src/counts1.txt": {"content": "test1234"}},
-            {f"{local_test_dir}/src/counts2.txt": {"content": "test1234"}},
-        ]
+    write_test_files(
+        {
+            setup_local_test_dir.src / "counts1.txt": "test1234",
+            setup_local_test_dir.src / "counts2.txt": "test1234",
+        }
     )
 
     # Create a transfer object
-    transfer_obj = transfer.Transfer(None, "local-counts", local_task_with_counts)
+    transfer_obj = transfer.Transfer(
+        None, "local-counts", local_task_with_counts(setup_local_test_dir)
+    )
 
     # Run the transfer and expect a true status
     assert transfer_obj.run()
 
 
-def test_local_counts_error():
+def test_local_counts_error(setup_local_test_dir):
     # Create a test file
-    fs.create_files(
-        [
-            {f"{local_test_dir}/src/counts_error1.txt": {"content": "test1234"}},
-        ]
+    write_test_files({setup_local_test_dir.src / "counts_error1.txt": "test1234"})
+    local_task_with_counts_error = clone_task_definition(
+        local_task_with_counts(setup_local_test_dir),
+        fileRegex="counts_error[0-9]\\.txt",
     )
-    local_task_with_counts_error = deepcopy(local_task_with_counts)
-    local_task_with_counts_error["source"]["fileRegex"] = "counts_error[0-9]\\.txt"
 
     # Create a transfer object
     transfer_obj = transfer.Transfer(
@@ -1189,11 +1315,11 @@ def test_local_counts_error():
     with pytest.raises(exceptions.FilesDoNotMeetConditionsError):
         transfer_obj.run()
 
-    fs.create_files(
-        [
-            {f"{local_test_dir}/src/counts_error2.txt": {"content": "test1234"}},
-            {f"{local_test_dir}/src/counts_error3.txt": {"content": "test1234"}},
-        ]
+    write_test_files(
+        {
+            setup_local_test_dir.src / "counts_error2.txt": "test1234",
+            setup_local_test_dir.src / "counts_error3.txt": "test1234",
+        }
     )
 
     transfer_obj = transfer.Transfer(
@@ -1207,37 +1333,33 @@ def test_local_counts_error():
         transfer_obj.run()
 
 
-def test_local_filewatch_counts():
+def test_local_filewatch_counts(setup_local_test_dir):
     # Create a test file
-    fs.create_files(
-        [
-            {f"{local_test_dir}/src/counts_watch1.txt": {"content": "test1234"}},
-            {f"{local_test_dir}/src/counts_watch2.txt": {"content": "test1234"}},
-        ]
+    write_test_files(
+        {
+            setup_local_test_dir.src / "counts_watch1.txt": "test1234",
+            setup_local_test_dir.src / "counts_watch2.txt": "test1234",
+        }
     )
 
     # Create a transfer object
     transfer_obj = transfer.Transfer(
-        None, "local-filewatch-counts", local_file_watch_task_with_counts
+        None,
+        "local-filewatch-counts",
+        local_file_watch_task_with_counts(setup_local_test_dir),
     )
 
     # Run the transfer and expect a true status
     assert transfer_obj.run()
 
 
-def test_local_filewatch_counts_error():
+def test_local_filewatch_counts_error(setup_local_test_dir):
     # Create a test file
-    fs.create_files(
-        [
-            {f"{local_test_dir}/src/counts_watch_error1.txt": {"content": "test1234"}},
-        ]
+    write_test_files({setup_local_test_dir.src / "counts_watch_error1.txt": "test1234"})
+    local_file_watch_task_with_counts_error = clone_task_definition(
+        local_file_watch_task_with_counts(setup_local_test_dir),
+        fileRegex="counts_watch_error[0-9]\\.txt",
     )
-    local_file_watch_task_with_counts_error = deepcopy(
-        local_file_watch_task_with_counts
-    )
-    local_file_watch_task_with_counts_error["source"][
-        "fileRegex"
-    ] = "counts_watch_error[0-9]\\.txt"
 
     # Create a transfer object
     transfer_obj = transfer.Transfer(
@@ -1250,11 +1372,11 @@ def test_local_filewatch_counts_error():
     with pytest.raises(exceptions.RemoteFileNotFoundError):
         transfer_obj.run()
 
-    fs.create_files(
-        [
-            {f"{local_test_dir}/src/counts_watch_error2.txt": {"content": "test1234"}},
-            {f"{local_test_dir}/src/counts_watch_error3.txt": {"content": "test1234"}},
-        ]
+    write_test_files(
+        {
+            setup_local_test_dir.src / "counts_watch_error2.txt": "test1234",
+            setup_local_test_dir.src / "counts_watch_error3.txt": "test1234",
+        }
     )
 
     transfer_obj = transfer.Transfer(
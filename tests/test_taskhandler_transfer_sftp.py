@@ -3,7 +3,9 @@
 import hashlib
 import os
 import random
+import shutil
 from copy import deepcopy
+from pathlib import Path
 
 import gnupg
 import pytest
@@ -12,6 +14,7 @@ from pytest_shell import fs
 
 from opentaskpy import exceptions
 from opentaskpy.taskhandlers import transfer
+from tests.file_helper import empty_directory, list_directory
 from tests.fixtures.pgp import *  # noqa: F403, F401
 from tests.fixtures.ssh_clients import *  # noqa: F403, F401
 
@@ -367,6 +370,12 @@ sftp_file_watch_task_with_counts = {
 }
 
 
+def _md5(path: str) -> str:
+    # Hash straight from the file, rather than reading it all into memory first
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "md5").hexdigest()
+
+
 def test_remote_handler(setup_sftp_keys):
     # Validate that given a transfer with sftp protocol, that we get a remote handler of type SFTP
 
@@ -501,7 +510,7 @@ def test_sftp_basic(root_dir, setup_sftp_keys):
         transfer_obj.run()
 
 
-def test_sftp_basic_host_key_validation(root_dir, setup_sftp_keys):
+def test_sftp_basic_host_key_validation(root_dir, setup_sftp_keys, known_hosts_cache):
     # Run the above test again, but this time with host key validation
     sftp_validation_task_definition = deepcopy(sftp_task_definition)
     sftp_validation_task_definition["source"]["fileRegex"] = ".*hostValidation.*\\.txt"
@@ -525,8 +534,7 @@ def test_sftp_basic_host_key_validation(root_dir, setup_sftp_keys):
     # Delete the known hosts file if it exists
     user_home = os.path.expanduser("~")
     known_hosts_file = f"{user_home}/.ssh/known_hosts"
-    if os.path.exists(known_hosts_file):
-        os.remove(known_hosts_file)
+    Path(known_hosts_file).unlink(missing_ok=True)
 
     print("Running first transfer")
 
@@ -540,9 +548,8 @@ def test_sftp_basic_host_key_validation(root_dir, setup_sftp_keys):
 
     print("Done first transfer")
 
-    # SSH onto the host manually and accept the host key so it's saved to the system known hosts
-    cmd = "ssh -o BatchMode=yes -o StrictHostKeyChecking=no -o ConnectTimeout=1 application@172.16.0.21 echo 'test'; ssh -o BatchMode=yes -o StrictHostKeyChecking=no -o ConnectTimeout=1 application@172.16.0.22 echo 'test' "
-    result = subprocess.run(cmd, shell=True, capture_output=True)
+    # Restore the host keys cached for the session, as if they had been accepted manually
+    shutil.copy(known_hosts_cache("172.16.0.21", "172.16.0.22"), known_hosts_file)
 
     print("Done SSH")
 
@@ -664,9 +671,10 @@ def test_sftp_filewatch_no_error(setup_sftp_keys):
 
 def test_sftp_basic_write_fin(root_dir, setup_sftp_keys):
     # Delete any fin files that exist
-    for file in os.listdir(f"{root_dir}/testFiles/sftp_2/dest"):
-        if file.endswith(".fin"):
-            os.remove(f"{root_dir}/testFiles/sftp_2/dest/{file}")
+    with os.scandir(f"{root_dir}/testFiles/sftp_2/dest") as entries:
+        for entry in entries:
+            if entry.name.endswith(".fin"):
+                os.remove(entry.path)
 
     # Create a test file
     fs.create_files(
@@ -700,8 +708,7 @@ def test_sftp_decrypt_incoming_file(
     fs.create_files([{f"{source_file}": {"content": "test12345678"}}])
 
     # Checksum the file
-    with open(f"{source_file}", "rb") as f:
-        original_file_checksum = hashlib.md5(f.read()).hexdigest()
+    original_file_checksum = _md5(f"{source_file}")
 
     # Create a gpg object
     gpg = gnupg.GPG(gnupghome=f"{tmpdir}")
@@ -750,8 +757,7 @@ def test_sftp_decrypt_incoming_file(
     assert os.path.exists(f"{tmpdir}/dest/test.decryption.txt")
     # Check that the file's checksum matches that of the original unencrypted source file
     # Check the checksum of the new file
-    with open(f"{tmpdir}/dest/test.decryption.txt", "rb") as f:
-        new_file_checksum = hashlib.md5(f.read()).hexdigest()
+    new_file_checksum = _md5(f"{tmpdir}/dest/test.decryption.txt")
     assert new_file_checksum == original_file_checksum
 
     # Make sure only 1 file exists under the destination
@@ -768,8 +774,7 @@ def test_sftp_encrypt_outgoing_file(
     fs.create_files([{f"{source_file}": {"content": "test12345678"}}])
 
     # Checksum the file
-    with open(f"{source_file}", "rb") as f:
-        original_file_checksum = hashlib.md5(f.read()).hexdigest()
+    original_file_checksum = _md5(f"{source_file}")
 
     # Create a gpg object
     gpg = gnupg.GPG(gnupghome=f"{tmpdir}")
@@ -813,8 +818,7 @@ def test_sftp_encrypt_outgoing_file(
 
     # Check that the file's checksum matches that of the original unencrypted source file
     # Check the checksum of the new file
-    with open(f"{tmpdir}/test.encryption.txt", "rb") as f:
-        new_file_checksum = hashlib.md5(f.read()).hexdigest()
+    new_file_checksum = _md5(f"{tmpdir}/test.encryption.txt")
     assert new_file_checksum == original_file_checksum
 
     # Run the transfer again, except do a rename as part of the upload
@@ -964,8 +968,7 @@ def test_sftp_to_sftp_decrypt(
     fs.create_files([{f"{source_file}": {"content": "test12345678"}}])
 
     # Checksum the file
-    with open(f"{source_file}", "rb") as f:
-        original_file_checksum = hashlib.md5(f.read()).hexdigest()
+    original_file_checksum = _md5(f"{source_file}")
 
     # Create a gpg object
     gpg = gnupg.GPG(gnupghome=f"{tmpdir}")
@@ -1005,8 +1008,7 @@ def test_sftp_to_sftp_decrypt(
     assert os.path.exists(dest_file)
     # Check that the file's checksum matches that of the original unencrypted source file
     # Check the checksum of the new file
-    with open(dest_file, "rb") as f:
-        new_file_checksum = hashlib.md5(f.read()).hexdigest()
+    new_file_checksum = _md5(dest_file)
     assert new_file_checksum == original_file_checksum
 
 
@@ -1020,8 +1022,7 @@ def test_sftp_to_sftp_encrypt_outgoing_file(
     fs.create_files([{f"{source_file}": {"content": "test12345678"}}])
 
     # Checksum the file
-    with open(f"{source_file}", "rb") as f:
-        original_file_checksum = hashlib.md5(f.read()).hexdigest()
+    original_file_checksum = _md5(f"{source_file}")
 
     # Create a gpg object
     gpg = gnupg.GPG(gnupghome=f"{tmpdir}")
@@ -1056,15 +1057,15 @@ def test_sftp_to_sftp_encrypt_outgoing_file(
 
     # Check that the file's checksum matches that of the original unencrypted source file
     # Check the checksum of the new file
-    with open(f"{root_dir}/testFiles/sftp_2/dest/test.encryption.e2e.txt", "rb") as f:
-        new_file_checksum = hashlib.md5(f.read()).hexdigest()
+    new_file_checksum = _md5(
+        f"{root_dir}/testFiles/sftp_2/dest/test.encryption.e2e.txt"
+    )
     assert new_file_checksum == original_file_checksum
 
 
 def test_pca_move(root_dir, setup_sftp_keys):
     # Empty the PCA archive directory
-    for file in os.listdir(f"{root_dir}/testFiles/sftp_1/archive"):
-        os.remove(f"{root_dir}/testFiles/sftp_1/archive/{file}")
+    empty_directory(f"{root_dir}/testFiles/sftp_1/archive")
 
     # Create the test file
     fs.create_files(
@@ -1125,8 +1126,7 @@ def test_pca_move(root_dir, setup_sftp_keys):
 
 def test_pca_move_posix(root_dir, setup_sftp_keys):
     # Empty the PCA archive directory
-    for file in os.listdir(f"{root_dir}/testFiles/sftp_1/archive"):
-        os.remove(f"{root_dir}/testFiles/sftp_1/archive/{file}")
+    empty_directory(f"{root_dir}/testFiles/sftp_1/archive")
 
     # Create the test file
     fs.create_files(
@@ -1203,8 +1203,7 @@ def test_destination_file_rename(root_dir, setup_sftp_keys):
 
 def test_pca_rename(root_dir, setup_sftp_keys):
     # Empty the PCA archive directory
-    for file in os.listdir(f"{root_dir}/testFiles/sftp_1/archive"):
-        os.remove(f"{root_dir}/testFiles/sftp_1/archive/{file}")
+    empty_directory(f"{root_dir}/testFiles/sftp_1/archive")
 
     # Create the test file
     fs.create_files(
@@ -1229,8 +1228,7 @@ def test_pca_rename(root_dir, setup_sftp_keys):
 def test_pca_rename_posix(root_dir, setup_sftp_keys):
 
     # Empty the PCA archive directory
-    for file in os.listdir(f"{root_dir}/testFiles/sftp_1/archive"):
-        os.remove(f"{root_dir}/testFiles/sftp_1/archive/{file}")
+    empty_directory(f"{root_dir}/testFiles/sftp_1/archive")
 
     # Create the test file
     fs.create_files(
@@ -1260,8 +1258,7 @@ def test_pca_rename_posix(root_dir, setup_sftp_keys):
 def test_pca_rename_many(root_dir, setup_sftp_keys):
     # Create the test file
     # Empty the PCA archive directory
-    for file in os.listdir(f"{root_dir}/testFiles/sftp_1/archive"):
-        os.remove(f"{root_dir}/testFiles/sftp_1/archive/{file}")
+    empty_directory(f"{root_dir}/testFiles/sftp_1/archive")
 
     # for 1 to 10
     for i in range(1, 10):
@@ -1281,20 +1278,17 @@ def test_pca_rename_many(root_dir, setup_sftp_keys):
 
     # Run the transfer and expect a true status
     assert transfer_obj.run()
-    # Check the destination file exists
+    # List each directory once, rather than checking every file individually
+    dest_files = list_directory(f"{root_dir}/testFiles/sftp_2/dest")
+    src_files = list_directory(f"{root_dir}/testFiles/sftp_1/src")
+    archive_files = list_directory(f"{root_dir}/testFiles/sftp_1/archive")
     for i in range(1, 10):
-        assert os.path.exists(
-            f"{root_dir}/testFiles/sftp_2/dest/pca_rename_many_{i}.txt"
-        )
+        # Check the destination file exists
+        assert f"pca_rename_many_{i}.txt" in dest_files
         # Check the source file no longer exists
-        assert not os.path.exists(
-            f"{root_dir}/testFiles/sftp_1/src/pca_rename_many_{i}.txt"
-        )
-
+        assert f"pca_rename_many_{i}.txt" not in src_files
         # Check the source file has been archived
-        assert os.path.exists(
-            f"{root_dir}/testFiles/sftp_1/archive/pca_renamed_many_{i}.txt"
-        )
+        assert f"pca_renamed_many_{i}.txt" in archive_files
 
 
 def test_sftp_proxy(root_dir, setup_sftp_keys):
@@ -1472,8 +1466,7 @@ def test_sftp_filewatch_counts_error(root_dir, setup_sftp_keys):
 
 def test_pca_move_nested(root_dir, setup_sftp_keys):
     # Empty the PCA archive directory
-    for file in os.listdir(f"{root_dir}/testFiles/sftp_1/archive"):
-        os.remove(f"{root_dir}/testFiles/sftp_1/archive/{file}")
+    empty_directory(f"{root_dir}/testFiles/sftp_1/archive")
 
     # Create the test file
     fs.create_files(
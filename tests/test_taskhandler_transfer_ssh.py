@@ -1,8 +1,10 @@
 # pylint: skip-file
 # ruff: noqa
 import os
+import shutil
 from copy import deepcopy
 from datetime import datetime
+from pathlib import Path
 
 import pytest
 from paramiko.ssh_exception import SSHException
@@ -10,6 +12,14 @@ from pytest_shell import fs
 
 from opentaskpy import exceptions
 from opentaskpy.taskhandlers import transfer
+from opentaskpy.taskhandlers.taskhandler import resolve_protocol_class
+from tests.file_helper import (
+    BASE_DIRECTORY,
+    clone_task_definition,
+    list_directory,
+    write_test_file,
+    write_test_files,
+)
 from tests.fixtures.ssh_clients import *  # noqa: F403, F401
 
 os.environ["OTF_NO_LOG"] = "1"
@@ -87,115 +97,47 @@ scp_with_fin_task_definition = {
     ],
 }
 
-# PCA move
-scp_pca_move_task_definition_1 = {
-    "type": "transfer",
-    "source": {
-        "hostname": "172.16.0.11",
-        "directory": "/tmp/testFiles/src",
-        "fileRegex": "pca_move\\.txt",
-        "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-        "postCopyAction": {
-            "action": "move",
-            "destination": "/tmp/testFiles/archive",
-        },
-    },
-    "destination": [
-        {
-            "hostname": "172.16.0.12",
-            "directory": "/tmp/testFiles/dest",
-            "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-        },
-    ],
-}
 
-scp_pca_move_task_definition_2 = {
-    "type": "transfer",
-    "source": {
-        "hostname": "172.16.0.11",
-        "directory": "/tmp/testFiles/src",
-        "fileRegex": "pca_move_2\\.txt",
-        "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-        "postCopyAction": {
-            "action": "move",
-            "destination": "/tmp/testFiles/archive/",
-        },
+# PCA task definitions only differ from the basic transfer in the files they pick up
+# and the post copy action
+scp_pca_move_task_definition_1 = clone_task_definition(
+    scp_task_definition,
+    fileRegex="pca_move\\.txt",
+    postCopyAction={"action": "move", "destination": "/tmp/testFiles/archive"},
+)
+scp_pca_move_task_definition_2 = clone_task_definition(
+    scp_task_definition,
+    fileRegex="pca_move_2\\.txt",
+    postCopyAction={"action": "move", "destination": "/tmp/testFiles/archive/"},
+)
+scp_pca_invalid_move_task_definition = clone_task_definition(
+    scp_task_definition,
+    fileRegex="pca_move_3\\.txt",
+    postCopyAction={
+        "action": "move",
+        "destination": "/tmp/testFiles/archive/pca_move_bad.txt",
     },
-    "destination": [
-        {
-            "hostname": "172.16.0.12",
-            "directory": "/tmp/testFiles/dest",
-            "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-        },
-    ],
-}
-
-scp_pca_invalid_move_task_definition = {
-    "type": "transfer",
-    "source": {
-        "hostname": "172.16.0.11",
-        "directory": "/tmp/testFiles/src",
-        "fileRegex": "pca_move_3\\.txt",
-        "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-        "postCopyAction": {
-            "action": "move",
-            "destination": "/tmp/testFiles/archive/pca_move_bad.txt",
-        },
+)
+scp_pca_rename_task_definition_1 = clone_task_definition(
+    scp_task_definition,
+    fileRegex="pca_rename_1\\.txt",
+    postCopyAction={
+        "action": "rename",
+        "destination": "/tmp/testFiles/archive/",
+        "pattern": "rename",
+        "sub": "renamed",
     },
-    "destination": [
-        {
-            "hostname": "172.16.0.12",
-            "directory": "/tmp/testFiles/dest",
-            "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-        },
-    ],
-}
-
-scp_pca_rename_task_definition_1 = {
-    "type": "transfer",
-    "source": {
-        "hostname": "172.16.0.11",
-        "directory": "/tmp/testFiles/src",
-        "fileRegex": "pca_rename_1\\.txt",
-        "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-        "postCopyAction": {
-            "action": "rename",
-            "destination": "/tmp/testFiles/archive/",
-            "pattern": "rename",
-            "sub": "renamed",
-        },
+)
+scp_pca_rename_many_task_definition_1 = clone_task_definition(
+    scp_task_definition,
+    fileRegex="pca_rename_many.*\\.txt",
+    postCopyAction={
+        "action": "rename",
+        "destination": "/tmp/testFiles/archive/",
+        "pattern": "rename",
+        "sub": "renamed",
     },
-    "destination": [
-        {
-            "hostname": "172.16.0.12",
-            "directory": "/tmp/testFiles/dest",
-            "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-        },
-    ],
-}
-
-scp_pca_rename_many_task_definition_1 = {
-    "type": "transfer",
-    "source": {
-        "hostname": "172.16.0.11",
-        "directory": "/tmp/testFiles/src",
-        "fileRegex": "pca_rename_many.*\\.txt",
-        "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-        "postCopyAction": {
-            "action": "rename",
-            "destination": "/tmp/testFiles/archive/",
-            "pattern": "rename",
-            "sub": "renamed",
-        },
-    },
-    "destination": [
-        {
-            "hostname": "172.16.0.12",
-            "directory": "/tmp/testFiles/dest",
-            "protocol": {"name": "ssh", "credentials": {"username": "application"}},
-        },
-    ],
-}
+)
 
 # Proxy task definition
 scp_proxy_task_definition = {
@@ -297,6 +239,18 @@ scp_file_watch_task_with_counts = {
 }
 
 
+# Directories used by the PCA tests, which check several files in each of them
+SSH_1_SRC = Path(BASE_DIRECTORY) / "ssh_1" / "src"
+SSH_1_ARCHIVE = Path(BASE_DIRECTORY) / "ssh_1" / "archive"
+SSH_2_DEST = Path(BASE_DIRECTORY) / "ssh_2" / "dest"
+
+
+def _recreate_directory(directory: str | Path) -> None:
+    # Recreate the directory, rather than unlinking each file inside it
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+
+
 def test_invalid_protocol():
     transfer_obj = transfer.Transfer(
         None, "invalid-protocol", fail_invalid_protocol_task_definition
@@ -316,6 +270,15 @@ def test_invalid_protocol():
     with pytest.raises(exceptions.UnknownProtocolError):
         transfer_obj._set_remote_handlers()
 
+    # Unknown protocols are cached too, so the import path isn't searched again
+    misses = resolve_protocol_class.cache_info().misses
+    transfer_obj = transfer.Transfer(
+        None, "invalid-protocol", fail_invalid_protocol_task_definition
+    )
+    with pytest.raises(exceptions.UnknownProtocolError):
+        transfer_obj._set_remote_handlers()
+    assert resolve_protocol_class.cache_info().misses == misses
+
 
 def test_remote_handler(setup_ssh_keys):
     # Validate that given a transfer with ssh protocol, that we get a remote handler of type SSH
@@ -352,10 +315,36 @@ def test_scp_basic(root_dir, setup_ssh_keys):
     # Run the transfer and expect a true status
     assert transfer_obj.run()
     # Check the destination file exists
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/test.taskhandler.txt")
+    assert os.path.lexists(f"{root_dir}/testFiles/ssh_2/dest/test.taskhandler.txt")
+
 
+def test_scp_basic_connection_pool(root_dir, setup_ssh_keys, monkeypatch):
+    monkeypatch.setenv("OTF_SSH_CONNECTION_POOL", "1")
 
-def test_ssh_basic_host_key_validation(root_dir, setup_ssh_keys):
+    # Run the same transfer twice, the second run should reuse both connections
+    clients = []
+    for i in range(2):
+        write_test_file(
+            f"{root_dir}/testFiles/ssh_1/src/test.taskhandler.txt", content="test1234"
+        )
+        transfer_obj = transfer.Transfer(None, f"scp-pooled-{i}", scp_task_definition)
+        assert transfer_obj.run()
+        clients.append(
+            (
+                transfer_obj.source_remote_handler.ssh_client,
+                transfer_obj.dest_remote_handlers[0].ssh_client,
+            )
+        )
+
+    assert clients[0][0] is clients[1][0]
+    assert clients[0][1] is clients[1][1]
+    assert clients[1][0].get_transport().is_active()
+
+    # Each host should still get its own connection
+    assert clients[0][0] is not clients[0][1]
+
+
+def test_ssh_basic_host_key_validation(root_dir, setup_ssh_keys, known_hosts_cache):
     # Run the above test again, but this time with host key validation
     ssh_validation_task_definition = deepcopy(scp_task_definition)
     ssh_validation_task_definition["source"]["fileRegex"] = ".*hostValidation.*\\.txt"
@@ -379,8 +368,7 @@ def test_ssh_basic_host_key_validation(root_dir, setup_ssh_keys):
     # Delete the known hosts file if it exists
     user_home = os.path.expanduser("~")
     known_hosts_file = f"{user_home}/.ssh/known_hosts"
-    if os.path.exists(known_hosts_file):
-        os.remove(known_hosts_file)
+    Path(known_hosts_file).unlink(missing_ok=True)
 
     print("Running first transfer")
 
@@ -394,9 +382,8 @@ def test_ssh_basic_host_key_validation(root_dir, setup_ssh_keys):
 
     print("Done first transfer")
 
-    # SSH onto the host manually and accept the host key so it's saved to the system known hosts
-    cmd = "ssh -o BatchMode=yes -o StrictHostKeyChecking=no -o ConnectTimeout=1 application@172.16.0.11 echo 'test'; ssh -o BatchMode=yes -o StrictHostKeyChecking=no -o ConnectTimeout=1 application@172.16.0.12 echo 'test' "
-    result = subprocess.run(cmd, shell=True, capture_output=True)
+    # Restore the host keys cached for the session, as if they had been accepted manually
+    shutil.copy(known_hosts_cache("172.16.0.11", "172.16.0.12"), known_hosts_file)
 
     print("Done SSH")
 
@@ -446,7 +433,7 @@ def test_scp_basic_ultra_debug(root_dir, setup_ssh_keys):
     # Run the transfer and expect a true status
     assert transfer_obj.run()
     # Check the destination file exists
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/test.taskhandler.txt")
+    assert os.path.lexists(f"{root_dir}/testFiles/ssh_2/dest/test.taskhandler.txt")
 
 
 def test_scp_basic_key_from_protocol_definition(root_dir, ssh_key_file):
@@ -469,7 +456,7 @@ def test_scp_basic_key_from_protocol_definition(root_dir, ssh_key_file):
     # Run the transfer and expect a true status
     assert transfer_obj.run()
     # Check the destination file exists
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/test.taskhandler.txt")
+    assert os.path.lexists(f"{root_dir}/testFiles/ssh_2/dest/test.taskhandler.txt")
 
 
 def test_scp_basic_create_dest_dir(root_dir, setup_ssh_keys):
@@ -495,7 +482,7 @@ def test_scp_basic_create_dest_dir(root_dir, setup_ssh_keys):
     # Run the transfer and expect a true status
     assert transfer_obj.run()
     # Check the destination file exists
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/test.taskhandler.txt")
+    assert os.path.lexists(f"{root_dir}/testFiles/ssh_2/dest/test.taskhandler.txt")
 
 
 def test_scp_basic_no_permissions(root_dir, setup_ssh_keys):
@@ -532,9 +519,10 @@ def test_scp_filewatch_no_error(setup_ssh_keys):
 
 def test_scp_basic_write_fin(root_dir, setup_ssh_keys):
     # Delete any fin files that exist
-    for file in os.listdir(f"{root_dir}/testFiles/ssh_2/dest"):
-        if file.endswith(".fin"):
-            os.remove(f"{root_dir}/testFiles/ssh_2/dest/{file}")
+    with os.scandir(f"{root_dir}/testFiles/ssh_2/dest") as entries:
+        for entry in entries:
+            if entry.name.endswith(".fin") and entry.is_file():
+                os.remove(entry.path)
 
     # Create a test file
     fs.create_files(
@@ -553,72 +541,66 @@ def test_scp_basic_write_fin(root_dir, setup_ssh_keys):
     # Run the transfer and expect a true status
     assert transfer_obj.run()
     # Check the destination file exists
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/test.taskhandler.fin.txt")
+    assert os.path.lexists(f"{root_dir}/testFiles/ssh_2/dest/test.taskhandler.fin.txt")
 
     # Check the fin file exists
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/scp_with_fin.fin")
-
-
-def test_pca_move(root_dir, setup_ssh_keys):
+    assert os.path.lexists(f"{root_dir}/testFiles/ssh_2/dest/scp_with_fin.fin")
+
+
+@pytest.mark.parametrize(
+    "task_id, task_definition, file_name, archived_name, valid",
+    [
+        (
+            "scp-pca-move",
+            scp_pca_move_task_definition_1,
+            "pca_move.txt",
+            "pca_move.txt",
+            True,
+        ),
+        # Trailing slash on the archive directory
+        (
+            "scp-pca-move-2",
+            scp_pca_move_task_definition_2,
+            "pca_move_2.txt",
+            "pca_move_2.txt",
+            True,
+        ),
+        # Archive destination is a file name, not a directory
+        (
+            "scp-pca-move-invalid",
+            scp_pca_invalid_move_task_definition,
+            "pca_move_3.txt",
+            "pca_move_bad.txt",
+            False,
+        ),
+    ],
+    ids=["move", "move_trailing_slash", "invalid_move"],
+)
+def test_pca_move(
+    setup_ssh_keys, task_id, task_definition, file_name, archived_name, valid
+):
     # Empty the PCA archive directory
-    for file in os.listdir(f"{root_dir}/testFiles/ssh_1/archive"):
-        os.remove(f"{root_dir}/testFiles/ssh_1/archive/{file}")
+    _recreate_directory(SSH_1_ARCHIVE)
 
     # Create the test file
-    fs.create_files(
-        [{f"{root_dir}/testFiles/ssh_1/src/pca_move.txt": {"content": "test1234"}}]
-    )
+    write_test_file(SSH_1_SRC / file_name, content="test1234")
     # Create a transfer object
-    transfer_obj = transfer.Transfer(
-        None, "scp-pca-move", scp_pca_move_task_definition_1
-    )
-
-    # Run the transfer and expect a true status
-    assert transfer_obj.run()
-    # Check the destination file exists
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/pca_move.txt")
-    # Check the source file no longer exists
-    assert not os.path.exists(f"{root_dir}/testFiles/ssh_1/src/pca_move.txt")
+    transfer_obj = transfer.Transfer(None, task_id, task_definition)
 
-    # Check the source file has been archived
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_1/archive/pca_move.txt")
+    if valid:
+        # Run the transfer and expect a true status
+        assert transfer_obj.run()
+    else:
+        # The transfer succeeds, but the post copy action fails
+        with pytest.raises(exceptions.RemoteTransferError):
+            transfer_obj.run()
 
-    # Create the next test file
-    fs.create_files(
-        [{f"{root_dir}/testFiles/ssh_1/src/pca_move_2.txt": {"content": "test1234"}}]
-    )
-    transfer_obj = transfer.Transfer(
-        None, "scp-pca-move-2", scp_pca_move_task_definition_2
-    )
-
-    # Run the transfer and expect a true status
-    assert transfer_obj.run()
-
-    # Check the destination file exists
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/pca_move_2.txt")
-    # Check the source file no longer exists
-    assert not os.path.exists(f"{root_dir}/testFiles/ssh_1/src/pca_move_2.txt")
-
-    # Check the source file has been archived
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_1/archive/pca_move_2.txt")
-
-    fs.create_files(
-        [{f"{root_dir}/testFiles/ssh_1/src/pca_move_3.txt": {"content": "test1234"}}]
-    )
-    transfer_obj = transfer.Transfer(
-        None, "scp-pca-move-invalid", scp_pca_invalid_move_task_definition
-    )
-
-    # Run the transfer and expect a true status
-    with pytest.raises(exceptions.RemoteTransferError):
-        transfer_obj.run()
     # Check the destination file exists
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/pca_move_3.txt")
-    # Check the source file should still exist
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_1/src/pca_move_3.txt")
-
-    # Check the source file has not been archived
-    assert not os.path.exists(f"{root_dir}/testFiles/ssh_1/archive/pca_move_bad.txt")
+    assert os.path.lexists(SSH_2_DEST / file_name)
+    # Check the source file has been removed, unless the move failed
+    assert os.path.lexists(SSH_1_SRC / file_name) != valid
+    # Check the source file has been archived, unless the move failed
+    assert os.path.lexists(SSH_1_ARCHIVE / archived_name) == valid
 
 
 def test_destination_file_rename(root_dir, setup_ssh_keys):
@@ -645,20 +627,17 @@ def test_destination_file_rename(root_dir, setup_ssh_keys):
     # Run the transfer and expect a true status
     assert transfer_obj.run()
     # Check the destination file exists
-    assert os.path.exists(
+    assert os.path.lexists(
         f"{root_dir}/testFiles/ssh_2/dest/dest_rename_{random_no}_TaskhaNDLER.txt"
     )
 
 
-def test_pca_rename(root_dir, setup_ssh_keys):
+def test_pca_rename(setup_ssh_keys):
     # Empty the PCA archive directory
-    for file in os.listdir(f"{root_dir}/testFiles/ssh_1/archive"):
-        os.remove(f"{root_dir}/testFiles/ssh_1/archive/{file}")
+    _recreate_directory(SSH_1_ARCHIVE)
 
     # Create the test file
-    fs.create_files(
-        [{f"{root_dir}/testFiles/ssh_1/src/pca_rename_1.txt": {"content": "test1234"}}]
-    )
+    write_test_file(SSH_1_SRC / "pca_rename_1.txt", content="test1234")
     # Create a transfer object
     transfer_obj = transfer.Transfer(
         None, "scp-pca-rename", scp_pca_rename_task_definition_1
@@ -667,31 +646,23 @@ def test_pca_rename(root_dir, setup_ssh_keys):
     # Run the transfer and expect a true status
     assert transfer_obj.run()
     # Check the destination file exists
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/pca_rename_1.txt")
+    assert os.path.lexists(SSH_2_DEST / "pca_rename_1.txt")
     # Check the source file no longer exists
-    assert not os.path.exists(f"{root_dir}/testFiles/ssh_1/src/pca_rename_1.txt")
+    assert not os.path.lexists(SSH_1_SRC / "pca_rename_1.txt")
 
     # Check the source file has been archived
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_1/archive/pca_renamed_1.txt")
+    assert os.path.lexists(SSH_1_ARCHIVE / "pca_renamed_1.txt")
 
 
-def test_pca_rename_many(root_dir, setup_ssh_keys):
+def test_pca_rename_many(setup_ssh_keys):
     # Create the test file
     # Empty the PCA archive directory
-    for file in os.listdir(f"{root_dir}/testFiles/ssh_1/archive"):
-        os.remove(f"{root_dir}/testFiles/ssh_1/archive/{file}")
+    _recreate_directory(SSH_1_ARCHIVE)
 
     # for 1 to 10
-    for i in range(1, 10):
-        fs.create_files(
-            [
-                {
-                    f"{root_dir}/testFiles/ssh_1/src/pca_rename_many_{i}.txt": {
-                        "content": "test1234"
-                    }
-                }
-            ]
-        )
+    write_test_files(
+        {SSH_1_SRC / f"pca_rename_many_{i}.txt": "test1234" for i in range(1, 10)}
+    )
     # Create a transfer object
     transfer_obj = transfer.Transfer(
         None, "scp-pca-rename-name", scp_pca_rename_many_task_definition_1
@@ -699,20 +670,17 @@ def test_pca_rename_many(root_dir, setup_ssh_keys):
 
     # Run the transfer and expect a true status
     assert transfer_obj.run()
-    # Check the destination file exists
+    # List each directory once, rather than checking every file individually
+    dest_files = list_directory(SSH_2_DEST)
+    src_files = list_directory(SSH_1_SRC)
+    archive_files = list_directory(SSH_1_ARCHIVE)
     for i in range(1, 10):
-        assert os.path.exists(
-            f"{root_dir}/testFiles/ssh_2/dest/pca_rename_many_{i}.txt"
-        )
+        # Check the destination file exists
+        assert f"pca_rename_many_{i}.txt" in dest_files
         # Check the source file no longer exists
-        assert not os.path.exists(
-            f"{root_dir}/testFiles/ssh_1/src/pca_rename_many_{i}.txt"
-        )
-
+        assert f"pca_rename_many_{i}.txt" not in src_files
         # Check the source file has been archived
-        assert os.path.exists(
-            f"{root_dir}/testFiles/ssh_1/archive/pca_renamed_many_{i}.txt"
-        )
+        assert f"pca_renamed_many_{i}.txt" in archive_files
 
 
 def test_scp_proxy(root_dir, setup_ssh_keys):
@@ -734,10 +702,12 @@ def test_scp_proxy(root_dir, setup_ssh_keys):
     # Run the transfer and expect a true status
     assert transfer_obj.run()
     # Check the destination file exists
-    assert os.path.exists(f"{root_dir}/testFiles/ssh_2/dest/test.taskhandler.proxy.txt")
+    assert os.path.lexists(
+        f"{root_dir}/testFiles/ssh_2/dest/test.taskhandler.proxy.txt"
+    )
 
     # Ensure that local files are tidied up
-    assert not os.path.exists(local_staging_dir)
+    assert not os.path.lexists(local_staging_dir)
 
 
 def test_invalid_ssh_decryption_direct():